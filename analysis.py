@@ -0,0 +1,214 @@
+"""
+A bounded cache of position analyses shared by the computer players.
+
+The same positions come up again and again over many games, so the
+analysis of a position, its best move, its value and the lines one mark
+short of winning, is looked up by a packed key before a player thinks
+about it. The least recently used analyses are dropped once the cache is
+full, which keeps its memory bounded.
+"""
+
+import threading
+from collections import OrderedDict
+from engine import PLAYER_SYMBOLS
+
+# Analyses kept by the cache shared by the players of a process
+DEFAULT_MAX_ENTRIES = 1 << 16
+
+# The cache shared by the players of this process, created on first use
+_shared_cache = None
+
+
+def position_key(game_board):
+    """
+    Packs a position into a single int: the marks of both sides, the side
+    to move and the board shape.
+
+    Parameters
+    ----------
+    game_board (GameBoard): The current state of the game board.
+
+    Returns
+    -------
+    int: The key of the position.
+    """
+    state = game_board.state
+    key = state.x_mask | state.o_mask << game_board.size * game_board.size
+    key = key << 1 | state.side
+    return (key << 8 | game_board.size) << 8 | game_board.win_length
+
+
+def threat_lines(game_board):
+    """
+    Finds the lines one mark short of winning without opposing marks, for
+    both sides.
+
+    Parameters
+    ----------
+    game_board (GameBoard): The current state of the game board.
+
+    Returns
+    -------
+    tuple: The cell indices of every such line.
+    """
+    needed = game_board.win_length - 1
+    lines = []
+    for side, symbol in enumerate(PLAYER_SYMBOLS):
+        own_counts = game_board.line_counts[symbol]
+        other_counts = game_board.line_counts[PLAYER_SYMBOLS[1 - side]]
+        # Only the lines through a winning move can be one mark short
+        for index in game_board.winning_moves(symbol):
+            for line_number in game_board.cell_lines[index]:
+                if own_counts[line_number] == needed and other_counts[line_number] == 0:
+                    line = game_board.lines[line_number]
+                    if line not in lines:
+                        lines.append(line)
+    return tuple(lines)
+
+
+class AnalysisCache:
+    """
+    Maps the keys of positions to their analysis and drops the least
+    recently used analysis once it is full. It can be used from several
+    threads.
+
+    Attributes
+    ----------
+    max_entries (int): The number of analyses kept, 0 to keep none.
+    hits (int): The number of lookups that found an analysis.
+    misses (int): The number of lookups that found nothing.
+    evictions (int): The number of analyses dropped to make room.
+
+    Methods
+    ----------
+    get(): Looks up the analysis of a position.
+
+    put(): Stores the analysis of a position.
+
+    stats(): Returns the counters and size of the cache.
+
+    clear(): Drops all analyses and resets the counters.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        Initializes a new, empty cache.
+
+        Parameters
+        ----------
+        max_entries (int): The number of analyses kept, 0 to keep none.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Looks up the analysis of a position and marks it as recently used.
+
+        Parameters
+        ----------
+        key (hashable): The key of the position, for example
+                        (difficulty, position_key(game_board)).
+
+        Returns
+        -------
+        analysis (tuple): (best move, value, threat lines), None if the
+                          position isn't in the cache.
+        """
+        with self._lock:
+            analysis = self._entries.get(key)
+            if analysis is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return analysis
+
+    def put(self, key, analysis):
+        """
+        Stores the analysis of a position, dropping the least recently used
+        one if the cache is full.
+
+        Parameters
+        ----------
+        key (hashable): The key of the position.
+        analysis (tuple): (best move, value, threat lines).
+
+        Returns
+        -------
+        None
+        """
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = analysis
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        """
+        Returns the counters and size of the cache.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        dict: The hits, misses, evictions, hit rate, entries and capacity.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+        }
+
+    def clear(self):
+        """
+        Drops all analyses and resets the counters.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+
+def shared_cache():
+    """
+    Returns the cache shared by all computer players of this process,
+    creating it the first time.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    AnalysisCache: The cache.
+    """
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = AnalysisCache()
+    return _shared_cache
@@ -0,0 +1,303 @@
+"""
+Vectorized analysis of many boards at once with NumPy.
+
+Boards are (N, 9) int8 arrays where 1 is an "X", -1 is an "O" and 0 is an
+empty cell.
+"""
+
+import numpy as np
+import solver
+from engine import WINNING_CONDITIONS
+from symmetry import canonicalize, from_canonical
+
+X = 1
+O = -1
+
+# The cells of each of the 8 winning conditions
+LINE_INDICES = np.array(WINNING_CONDITIONS, dtype=np.intp)
+
+# (9, 8) bool array, True where a cell lies on a winning condition
+CELL_LINES = (LINE_INDICES[None, :, :] == np.arange(9)[:, None, None]).any(axis=2)
+
+_CELL_BITS = np.arange(9, dtype=np.int64)
+
+_POWERS_OF_THREE = 3 ** np.arange(9, dtype=np.int32)
+
+# Perfect move per base-3 board key for X (row 0) and O (row 1), filled on first use
+_perfect_moves = None
+
+
+def boards_from_masks(x_masks, o_masks):
+    """
+    Builds a board array from the masks of GameBoard instances.
+
+    Parameters
+    ----------
+    x_masks (array-like): The 9-bit masks of the "X" marks.
+    o_masks (array-like): The 9-bit masks of the "O" marks.
+
+    Returns
+    -------
+    boards (np.ndarray): The (N, 9) int8 boards.
+    """
+    x_masks = np.asarray(x_masks, dtype=np.int64)[:, None]
+    o_masks = np.asarray(o_masks, dtype=np.int64)[:, None]
+    x_cells = (x_masks >> _CELL_BITS) & 1
+    o_cells = (o_masks >> _CELL_BITS) & 1
+    return (x_cells - o_cells).astype(np.int8)
+
+
+def line_sums(boards):
+    """
+    Sums the cells of every winning condition on every board.
+
+    Parameters
+    ----------
+    boards (np.ndarray): The (N, 9) int8 boards.
+
+    Returns
+    -------
+    sums (np.ndarray): (N, 8) sums, 3 is a line of "X" and -3 a line of "O".
+    """
+    return boards[:, LINE_INDICES].sum(axis=2, dtype=np.int8)
+
+
+def winners(boards):
+    """
+    Finds the winner of every board.
+
+    Parameters
+    ----------
+    boards (np.ndarray): The (N, 9) int8 boards.
+
+    Returns
+    -------
+    winners (np.ndarray): (N,) int8 array, 1 if "X" won, -1 if "O" won, else 0.
+    """
+    sums = line_sums(boards)
+    return (sums == 3).any(axis=1).astype(np.int8) - (sums == -3).any(axis=1)
+
+
+def threatened_lines(boards, player):
+    """
+    Finds the lines where a player has 2 marks and the third cell is empty.
+
+    Parameters
+    ----------
+    boards (np.ndarray): The (N, 9) int8 boards.
+    player (int): X or O.
+
+    Returns
+    -------
+    threats (np.ndarray): (N, 8) bool array, True for every threatened line.
+    """
+    # Cells are -1, 0 or 1, so a sum of 2 can only be 2 marks and an empty cell
+    return line_sums(boards) == 2 * player
+
+
+def fork_cells(boards, player):
+    """
+    Finds the empty cells that give a player two winning moves at once: the
+    cells on two lines where the player has one mark and the other cells
+    are empty. Two lines of a 3x3 board only share one cell, so their
+    winning moves are distinct.
+
+    Parameters
+    ----------
+    boards (np.ndarray): The (N, 9) int8 boards.
+    player (int): X or O.
+
+    Returns
+    -------
+    forks (np.ndarray): (N, 9) bool array, True for every fork cell.
+    """
+    line_cells = boards[:, LINE_INDICES]
+    building = ((line_cells == player).sum(axis=2) == 1) & (
+        (line_cells == 0).sum(axis=2) == 2
+    )
+    building_lines = building.astype(np.int8) @ CELL_LINES.T.astype(np.int8)
+    return (building_lines >= 2) & (boards == 0)
+
+
+def _first_threat_moves(boards, threats):
+    """
+    Returns the empty cell of the first threatened line of every board.
+
+    Parameters
+    ----------
+    boards (np.ndarray): The (N, 9) int8 boards.
+    threats (np.ndarray): (N, 8) bool array of threatened lines.
+
+    Returns
+    -------
+    moves (np.ndarray): (N,) array with the cell to play, -1 without a threat.
+    """
+    first_line = threats.argmax(axis=1)
+    line_cells = LINE_INDICES[first_line]
+    empty_position = (boards[np.arange(len(boards))[:, None], line_cells] == 0).argmax(
+        axis=1
+    )
+    moves = line_cells[np.arange(len(boards)), empty_position]
+    return np.where(threats.any(axis=1), moves, -1)
+
+
+def random_moves(boards, rng):
+    """
+    Picks a random empty cell on every board.
+
+    Parameters
+    ----------
+    boards (np.ndarray): The (N, 9) int8 boards.
+    rng (np.random.Generator): The random number generator.
+
+    Returns
+    -------
+    moves (np.ndarray): (N,) array with the cell to play, -1 on a full board.
+    """
+    return _random_cells(boards == 0, rng)
+
+
+def _random_cells(candidates, rng):
+    """
+    Picks a random candidate cell on every board.
+
+    Parameters
+    ----------
+    candidates (np.ndarray): (N, 9) bool array of the cells to pick from.
+    rng (np.random.Generator): The random number generator.
+
+    Returns
+    -------
+    moves (np.ndarray): (N,) array with the cell to play, -1 without a
+                        candidate.
+    """
+    scores = np.where(candidates, rng.random(candidates.shape), -1.0)
+    return np.where(candidates.any(axis=1), scores.argmax(axis=1), -1)
+
+
+def _build_perfect_moves():
+    """
+    Builds the lookup table of perfect moves for every base-3 board key.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    moves (np.ndarray): (2, 3 ** 9) int8 array, -1 for positions that are
+                        finished or can't be reached.
+    """
+    solved_positions = solver.solve()
+    moves = np.full((2, 3**9), -1, dtype=np.int8)
+    for key in range(3**9):
+        x_mask = o_mask = 0
+        remaining = key
+        for index in range(9):
+            remaining, cell = divmod(remaining, 3)
+            if cell == 1:
+                x_mask |= 1 << index
+            elif cell == 2:
+                o_mask |= 1 << index
+        for row, (own_mask, other_mask) in enumerate(
+            ((x_mask, o_mask), (o_mask, x_mask))
+        ):
+            canonical_key, transform = canonicalize(own_mask, other_mask)
+            solved = solved_positions.get(canonical_key)
+            if solved is not None:
+                moves[row, key] = from_canonical(solved[1][0], transform)
+    return moves
+
+
+def perfect_moves(boards, player):
+    """
+    Looks up a perfect move for every board.
+
+    Parameters
+    ----------
+    boards (np.ndarray): The (N, 9) int8 boards.
+    player (int): X or O, the player to move.
+
+    Returns
+    -------
+    moves (np.ndarray): (N,) array with the cell to play, -1 if the game is over.
+    """
+    global _perfect_moves
+    if _perfect_moves is None:
+        _perfect_moves = _build_perfect_moves()
+    keys = (boards.astype(np.int32) % 3) @ _POWERS_OF_THREE
+    return _perfect_moves[0 if player == X else 1, keys].astype(np.intp)
+
+
+def choose_moves(boards, player, difficulty="hard", rng=None):
+    """
+    Chooses the AI move for every board.
+
+    The "hard" difficulty follows the same priorities as HardStrategy after
+    its first turn: win if possible, otherwise block, otherwise set up a
+    fork, otherwise block one of the opponent's forks, otherwise play
+    randomly.
+
+    Parameters
+    ----------
+    boards (np.ndarray): The (N, 9) int8 boards.
+    player (int): X or O, the player to move.
+    difficulty (str): "easy", "hard" or "perfect".
+    rng (np.random.Generator): The random number generator.
+
+    Returns
+    -------
+    moves (np.ndarray): (N,) array with the cell to play, -1 on a full board.
+
+    Raises
+    ------
+    ValueError: If the difficulty is unknown.
+    """
+    rng = rng or np.random.default_rng()
+    if difficulty == "perfect":
+        return perfect_moves(boards, player)
+    if difficulty == "easy":
+        return random_moves(boards, rng)
+    if difficulty != "hard":
+        raise ValueError(f"Unknown difficulty {difficulty!r}")
+    sums = line_sums(boards)
+    winning_moves = _first_threat_moves(boards, sums == 2 * player)
+    blocking_moves = _first_threat_moves(boards, sums == -2 * player)
+    own_forks = _random_cells(fork_cells(boards, player), rng)
+    blocked_forks = _random_cells(fork_cells(boards, -player), rng)
+    moves = np.where(blocked_forks >= 0, blocked_forks, random_moves(boards, rng))
+    moves = np.where(own_forks >= 0, own_forks, moves)
+    moves = np.where(blocking_moves >= 0, blocking_moves, moves)
+    return np.where(winning_moves >= 0, winning_moves, moves)
+
+
+def play_games(games, difficulty_x, difficulty_o, rng=None):
+    """
+    Plays many games at once, "X" always takes the first turn.
+
+    Parameters
+    ----------
+    games (int): The number of games to play.
+    difficulty_x (str): The difficulty of the "X" player.
+    difficulty_o (str): The difficulty of the "O" player.
+    rng (np.random.Generator): The random number generator.
+
+    Returns
+    -------
+    winners (np.ndarray): (games,) int8 array, 1 if "X" won, -1 if "O" won,
+                          else 0.
+    """
+    rng = rng or np.random.default_rng()
+    boards = np.zeros((games, 9), dtype=np.int8)
+    results = np.zeros(games, dtype=np.int8)
+    active = np.arange(games)
+    for turn in range(9):
+        player, difficulty = (X, difficulty_x) if turn % 2 == 0 else (O, difficulty_o)
+        moves = choose_moves(boards[active], player, difficulty, rng)
+        boards[active, moves] = player
+        results[active] = winners(boards[active])
+        # Only keep playing the games that nobody won yet
+        active = active[results[active] == 0]
+        if not len(active):
+            break
+    return results
@@ -0,0 +1,290 @@
+"""
+Benchmarks for the hot paths of the game: AI move latency, self-play
+throughput and the win checks.
+
+Results are written as JSON so runs can be compared between commits:
+
+    python bench.py --output before.json
+    python bench.py --compare before.json
+
+The comparison exits with status 1 when a benchmark got slower than the
+tolerance allows.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import timeit
+from ai import ComputerPlayer
+from analysis import AnalysisCache
+from engine import GameBoard
+from simulate import play_game
+from strategies import CHEAP, SEARCHING, get_strategy, strategy_names
+
+# Marks already on the board for each benchmark position
+POSITIONS = {"empty": 0, "mid": 4, "near_full": 7}
+
+# Slower than the baseline by more than this fraction counts as a regression
+DEFAULT_TOLERANCE = 0.2
+
+
+def make_position(marks, rng):
+    """
+    Plays random moves until a position with a number of marks is reached
+    that isn't finished yet.
+
+    Parameters
+    ----------
+    marks (int): The number of marks on the board.
+    rng (random.Random): The random number generator.
+
+    Returns
+    -------
+    game_board (GameBoard): The position, "O" is to move for odd counts.
+    """
+    while True:
+        game_board = GameBoard()
+        symbol = "X"
+        for _ in range(marks):
+            game_board.place(game_board.random_free_cell(rng), symbol)
+            symbol = "O" if symbol == "X" else "X"
+        if not game_board.is_over():
+            return game_board
+
+
+def percentile(samples, fraction):
+    """
+    Returns a percentile of a list of samples.
+
+    Parameters
+    ----------
+    samples (list): The measured values.
+    fraction (float): The percentile as a fraction, 0.99 for p99.
+
+    Returns
+    -------
+    float: The value below which that fraction of the samples lies.
+    """
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def bench_move_latency(difficulty, samples, rng, seed=0):
+    """
+    Measures how long a computer player takes to pick a move.
+
+    Parameters
+    ----------
+    difficulty (str): The difficulty of the computer player.
+    samples (int): The number of moves to time.
+    rng (random.Random): The random number generator of the positions.
+    seed (int): The seed of the computer player's own random number
+                generator.
+
+    Returns
+    -------
+    results (dict): p50 and p99 latency in microseconds.
+    """
+    # Without a cache, so repeated positions are searched again. The player
+    # gets its own generator, searches that stop on time draw a varying
+    # number of random numbers and would change the positions that follow
+    computer_player = ComputerPlayer(
+        difficulty, "O", random.Random(seed), analysis_cache=AnalysisCache(0)
+    )
+    latencies = []
+    for sample in range(samples):
+        # Only positions where "O" is to move
+        game_board = make_position(1 + 2 * (sample % 4), rng)
+        start = time.perf_counter()
+        computer_player.handle_turn(game_board)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return {
+        f"move_latency.{difficulty}.p50_us": percentile(latencies, 0.5),
+        f"move_latency.{difficulty}.p99_us": percentile(latencies, 0.99),
+    }
+
+
+def bench_self_play(difficulty, games, seed=0):
+    """
+    Measures how many full games of self-play run per second.
+
+    Parameters
+    ----------
+    difficulty (str): The difficulty of both players.
+    games (int): The number of games to play.
+    seed (int): The seed of the players' random number generator.
+
+    Returns
+    -------
+    results (dict): Games per second.
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for game_number in range(games):
+        play_game(
+            ComputerPlayer(difficulty, "X", rng),
+            ComputerPlayer(difficulty, "O", rng),
+            x_starts=game_number % 2 == 0,
+        )
+    return {
+        f"self_play.{difficulty}.games_per_s": games / (time.perf_counter() - start)
+    }
+
+
+def bench_win_checks(repeat, rng):
+    """
+    Measures placing a mark with its win check and taking it back, and the
+    threat checks of the hard AI, winning and fork moves for both symbols,
+    on empty, mid-game and near-full positions.
+
+    Parameters
+    ----------
+    repeat (int): The number of calls to time per benchmark.
+    rng (random.Random): The random number generator.
+
+    Returns
+    -------
+    results (dict): The time per call in nanoseconds.
+    """
+    results = {}
+    for name, marks in POSITIONS.items():
+        game_board = make_position(marks, rng)
+        cell = game_board.random_free_cell(rng)
+        symbol = "X" if marks % 2 == 0 else "O"
+
+        # Take the move back each time, so the same board is reused and
+        # nothing but the move and its win check is timed
+        def place_and_check():
+            game_board.place(cell, symbol)
+            winner = game_board.winner()
+            game_board.undo()
+            return winner
+
+        place_time = min(timeit.repeat(place_and_check, number=repeat, repeat=7))
+        results[f"check_winner.{name}.ns"] = place_time / repeat * 1e9
+
+        # The checks HardStrategy makes before falling back to a random cell
+        def threat_checks():
+            for threat_symbol in ("O", "X"):
+                game_board.winning_moves(threat_symbol)
+            for threat_symbol in ("O", "X"):
+                game_board.fork_moves(threat_symbol)
+
+        threats_time = min(timeit.repeat(threat_checks, number=repeat, repeat=7))
+        results[f"threat_checks.{name}.ns"] = threats_time / repeat * 1e9
+    return results
+
+
+def run_benchmarks(quick=False, seed=0):
+    """
+    Runs all benchmarks.
+
+    Parameters
+    ----------
+    quick (bool): Use fewer samples for a fast but noisier run.
+    seed (int): The seed for the benchmark positions and players.
+
+    Returns
+    -------
+    results (dict): Benchmark names mapped to their values.
+    """
+    rng = random.Random(seed)
+    scale = 10 if quick else 1
+    results = {}
+    for difficulty in strategy_names(3):
+        # Searching AIs think for their full time limit, so fewer samples
+        samples = 40 if get_strategy(difficulty).cost == SEARCHING else 2000
+        results.update(
+            bench_move_latency(difficulty, max(4, samples // scale), rng, seed)
+        )
+    for difficulty in strategy_names(3, CHEAP):
+        results.update(bench_self_play(difficulty, 2000 // scale, seed))
+    results.update(bench_win_checks(20000 // scale, rng))
+    return results
+
+
+def is_higher_better(name):
+    """
+    Tells if a bigger value of a benchmark is an improvement.
+
+    Parameters
+    ----------
+    name (str): The name of the benchmark.
+
+    Returns
+    -------
+    bool: True for throughputs, False for times.
+    """
+    return name.endswith("_per_s")
+
+
+def find_regressions(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compares results with a baseline run.
+
+    Parameters
+    ----------
+    results (dict): The results of this run.
+    baseline (dict): The results of the run to compare with.
+    tolerance (float): How much slower a benchmark may get, as a fraction.
+
+    Returns
+    -------
+    regressions (list): (name, baseline value, value) of every benchmark
+                        that got slower than the tolerance allows.
+    """
+    regressions = []
+    for name, value in results.items():
+        if name not in baseline:
+            continue
+        old_value = baseline[name]
+        if is_higher_better(name):
+            regressed = value < old_value * (1 - tolerance)
+        else:
+            regressed = value > old_value * (1 + tolerance)
+        if regressed:
+            regressions.append((name, old_value, value))
+    return regressions
+
+
+def main():
+    """
+    Runs the benchmarks from the command line.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the Tic Tac Toe AI.")
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of a baseline run")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--quick", action="store_true", help="fewer samples")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.quick, args.seed)
+    for name, value in results.items():
+        print(f"{name:40} {value:14.1f}")
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for name, old_value, value in regressions:
+            print(f"Regression in {name}: {old_value:.1f} -> {value:.1f}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
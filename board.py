@@ -1,5 +1,15 @@
 import tkinter as tk
+import tkinter.font as tkfont
 from functools import partial
+from engine import EMPTY
+
+# Colors of the marks of both symbols
+MARK_COLORS = {"X": "red", "O": "blue"}
+
+# Sizes of the cells and marks on a 3x3 board, bigger boards scale them down
+CELL_WIDTH = 25
+CELL_HEIGHT = 12
+MARK_FONT_SIZE = 73
 
 
 class TicTacToeBoard:
@@ -10,16 +20,28 @@ class TicTacToeBoard:
     ----------
     master (tk.Tk): The main Tkinter window.
     buttons (list): List of button widgets representing thegame cells.
+    mark_font (tkfont.Font): The font of the marks, shared by all cells.
+    label_font (tkfont.Font): The font of the turn label.
+    mark_options (dict): Styling options for the marks of both symbols.
+    empty_options (dict): Styling options of an empty cell.
 
     Methods
     ----------
     __init__(): Initializes a new instance of the TicTacToeBoard class.
 
-    create_board(): Creates the game board.
+    create_board(): Shows the game board, building it for the first game.
+
+    build_board(): Builds the widgets of the game board.
+
+    render(): Renders the game board once the window is idle.
+
+    render_now(): Renders the cells that changed since the last render.
+
+    render_pending(): Checks if a render is waiting for the window to be idle.
 
     change_turn_label(): Changes the label that indicates who's turn it is.
 
-    remove_gameboard(): Clears the gameboard once a game is finished to make room for the main menu.
+    remove_gameboard(): Hides the gameboard once a game is finished to make room for the main menu.
     """
 
     def __init__(self, master):
@@ -36,10 +58,16 @@ class TicTacToeBoard:
         """
         self.master = master
         self.buttons = []
+        # The symbol shown in every cell and the text of the turn label, so
+        # only what changed gets configured
+        self._rendered = []
+        self._turn_text = None
+        self._render_job = None
 
     def create_board(self, player_one, game_instance):
         """
-        Creates the Tic Tac Toe game board.
+        Shows the Tic Tac Toe game board. The widgets are built for the first
+        game only, later games reset and reuse them.
 
         Parameters
         ----------
@@ -51,24 +79,64 @@ class TicTacToeBoard:
         None
         """
         self.game_instance = game_instance
+        if not self.buttons:
+            self.build_board()
+        else:
+            # Clears the marks of the last game
+            self.render_now()
+
+        # Remove main menu widgets
+        self.master.new_game_button.grid_remove()
+        self.master.welcome_label.grid_remove()
+
+        self.board_frame.grid()
+        self.change_turn_label(player_one.player_name)
+        self.turn_label.grid()
+
+    def build_board(self):
+        """
+        Builds the widgets of the game board.
 
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
         # Create a frame for the board
         self.board_frame = tk.Frame(self.master)
         self.board_frame.grid(row=0, column=0, padx=125, pady=50)
 
-        # Remove main menu widgets
-        self.master.new_game_button.grid_remove()
-        self.master.welcome_label.grid_remove()
+        # Scale the cells and marks so bigger boards fit in the window. The
+        # fonts are created once instead of parsed from a tuple on every mark
+        size = self.game_instance.game_board.size
+        self.mark_font = tkfont.Font(
+            root=self.master,
+            family="Helvetica",
+            size=max(8, MARK_FONT_SIZE * 3 // size),
+        )
+        self.label_font = tkfont.Font(root=self.master, family="Helvetica", size=26)
+        self.mark_options = {
+            symbol: {
+                "font": self.mark_font,
+                "width": 3,
+                "height": 1,
+                "fg": color,
+            }
+            for symbol, color in MARK_COLORS.items()
+        }
 
         # Add buttons / game board
         row_number = 0
         column_number = 0
-        for i in range(0, 9):
+        for i in range(0, size * size):
             self.new_button = tk.Button(
                 self.board_frame,
                 text="",
-                width=25,
-                height=12,
+                width=max(1, CELL_WIDTH * 3 // size),
+                height=max(1, CELL_HEIGHT * 3 // size),
                 borderwidth=1,
                 relief="solid",
                 command=partial(self.game_instance.handle_turn, i),
@@ -76,19 +144,91 @@ class TicTacToeBoard:
             self.buttons.append(self.new_button)
             self.new_button.grid(row=row_number, column=column_number)
             column_number += 1
-            if column_number == 3:
+            if column_number == size:
                 column_number = 0
                 row_number += 1
 
+        # Remember how an empty cell looks to reset the cells for a new game
+        self.empty_options = {
+            option: self.buttons[0].cget(option)
+            for option in ("width", "height", "font", "fg")
+        }
+        self._rendered = [EMPTY] * (size * size)
+
         # Add label indicating who's turn it is
         self.turn_label = tk.Label(
             self.master,
-            text=f"{player_one.player_name} it is your turn.",
-            font=("Helvetica", 26),
+            font=self.label_font,
             fg="#D21404",
         )
         self.turn_label.grid(row=3, column=0)
 
+    def render(self):
+        """
+        Renders the game board once the window is idle, so several changes
+        in a row are rendered together.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        if self._render_job is None:
+            self._render_job = self.master.after_idle(self._render_idle)
+
+    def _render_idle(self):
+        """
+        Renders the game board when the window is idle, through the game so
+        the render counts towards the turn that changed the board.
+        """
+        self._render_job = None
+        self.game_instance.finish_render()
+
+    def render_pending(self):
+        """
+        Checks if a render is waiting for the window to be idle.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        bool: True if a render is scheduled.
+        """
+        return self._render_job is not None
+
+    def render_now(self):
+        """
+        Renders the cells that changed since the last render right away,
+        dropping a pending render.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        if self._render_job is not None:
+            self.master.after_cancel(self._render_job)
+            self._render_job = None
+        cells = self.game_instance.game_board.cells
+        rendered = self._rendered
+        if cells == rendered:
+            return
+        for index, symbol in enumerate(cells):
+            if symbol != rendered[index]:
+                if symbol == EMPTY:
+                    self.buttons[index].config(text="", **self.empty_options)
+                else:
+                    self.buttons[index].config(text=symbol, **self.mark_options[symbol])
+                rendered[index] = symbol
+
     def change_turn_label(self, player_name):
         """
         Changes the turn label
@@ -101,11 +241,15 @@ class TicTacToeBoard:
         -------
         None
         """
-        self.turn_label.config(text=f"{player_name} it is your turn.")
+        text = f"{player_name} it is your turn."
+        if text != self._turn_text:
+            self.turn_label.config(text=text)
+            self._turn_text = text
 
     def remove_gameboard(self):
         """
-        Clears the gameboard once a game is finished to make room for the main menu.
+        Hides the gameboard once a game is finished to make room for the main
+        menu. The widgets are kept for the next game.
 
         Parameters
         ----------
@@ -115,11 +259,8 @@ class TicTacToeBoard:
         -------
         None
         """
-        for button in self.buttons:
-            button.grid_remove()
+        self.game_instance.cancel_computer_turn()
         self.turn_label.grid_remove()
         self.board_frame.grid_remove()
-        self.game_instance.player_one_squares = []
-        self.game_instance.player_two_squares = []
-        self.game_instance.computer_squares = []
+        self.game_instance.game_board.reset()
         self.game_instance.main_menu()
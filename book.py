@@ -0,0 +1,244 @@
+"""
+Opening book and endgame tablebase for the 3x3 board in a compact binary file.
+
+The file holds a header followed by one fixed-size record per canonical
+position, sorted by its base-3 key. It is opened with mmap and searched with
+a binary search, so it is never loaded into Python objects and the pages are
+shared between processes.
+"""
+
+import mmap
+import os
+import random
+import struct
+import solver
+from symmetry import canonicalize, from_canonical
+
+# Magic bytes, format version and number of records
+HEADER = struct.Struct("<4sHI")
+MAGIC = b"TTTB"
+VERSION = 1
+
+# Base-3 key, value for the player to move and mask of the best moves
+RECORD = struct.Struct("<HbH")
+
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+# The base-3 number of every 9-bit mask, with a 1 for every set cell
+BASE3_OF_MASK = tuple(
+    sum(3**index for index in range(9) if mask >> index & 1) for mask in range(512)
+)
+
+# The book at DEFAULT_BOOK_PATH, opened on first use
+_default_book = None
+
+
+def base3_key(own_mask, other_mask):
+    """
+    Packs a position into a base-3 key, 1 for a mark of the player to move
+    and 2 for a mark of the opponent.
+
+    Parameters
+    ----------
+    own_mask (int): The marks of the player to move.
+    other_mask (int): The marks of the opponent.
+
+    Returns
+    -------
+    int: The base-3 key, smaller than 3 ** 9.
+    """
+    return BASE3_OF_MASK[own_mask] + 2 * BASE3_OF_MASK[other_mask]
+
+
+def write_book(path=DEFAULT_BOOK_PATH):
+    """
+    Writes the value and best moves of every reachable position to a file.
+
+    Parameters
+    ----------
+    path (str): The file to write.
+
+    Returns
+    -------
+    count (int): The number of positions written.
+    """
+    records = []
+    for key, (value, best_moves) in solver.solve().items():
+        own_mask, other_mask = key & 0x1FF, key >> 9
+        moves_mask = sum(1 << move for move in best_moves)
+        records.append((base3_key(own_mask, other_mask), value, moves_mask))
+    records.sort()
+    with open(path, "wb") as book_file:
+        book_file.write(HEADER.pack(MAGIC, VERSION, len(records)))
+        for record in records:
+            book_file.write(RECORD.pack(*record))
+    return len(records)
+
+
+class OpeningBook:
+    """
+    Looks positions up in a book file without loading it into memory.
+
+    Attributes
+    ----------
+    path (str): The book file.
+    count (int): The number of positions in the book.
+
+    Methods
+    ----------
+    lookup(): Returns the value and best moves of a position.
+
+    best_move(): Picks one of the best moves of a position.
+
+    close(): Closes the book file.
+    """
+
+    def __init__(self, path=DEFAULT_BOOK_PATH):
+        """
+        Opens a book file.
+
+        Parameters
+        ----------
+        path (str): The book file.
+
+        Raises
+        ------
+        ValueError: If the file isn't a book of a supported version.
+        """
+        self.path = path
+        with open(path, "rb") as book_file:
+            self._map = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            self._map.close()
+            raise ValueError(f"{path} is not an opening book")
+        magic, version, self.count = HEADER.unpack_from(self._map)
+        expected_size = HEADER.size + self.count * RECORD.size
+        if magic != MAGIC or version != VERSION or len(self._map) != expected_size:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} opening book")
+
+    def lookup(self, own_mask, other_mask):
+        """
+        Returns the value and best moves of a position.
+
+        Parameters
+        ----------
+        own_mask (int): The marks of the player to move.
+        other_mask (int): The marks of the opponent.
+
+        Returns
+        -------
+        value (int): Positive if the player to move wins, 0 for a draw.
+        best_moves (tuple): The best cells to play.
+        None if the position is finished or can't be reached.
+        """
+        canonical, transform = canonicalize(own_mask, other_mask)
+        key = base3_key(canonical & 0x1FF, canonical >> 9)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            record_key, value, moves_mask = RECORD.unpack_from(
+                self._map, HEADER.size + middle * RECORD.size
+            )
+            if record_key < key:
+                low = middle + 1
+            elif record_key > key:
+                high = middle
+            else:
+                best_moves = tuple(
+                    from_canonical(move, transform)
+                    for move in range(9)
+                    if moves_mask >> move & 1
+                )
+                return value, best_moves
+        return None
+
+    def best_move(self, own_mask, other_mask, rng=random):
+        """
+        Picks one of the best moves of a position.
+
+        Parameters
+        ----------
+        own_mask (int): The marks of the player to move.
+        other_mask (int): The marks of the opponent.
+        rng (random.Random): The random number generator that picks between
+                             equally good moves.
+
+        Returns
+        -------
+        index (int): The cell to play, None if the position isn't in the book.
+        """
+        entry = self.lookup(own_mask, other_mask)
+        if entry is not None:
+            return rng.choice(entry[1])
+
+    def close(self):
+        """
+        Closes the book file.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        self._map.close()
+
+
+def default_book():
+    """
+    Opens the book at DEFAULT_BOOK_PATH once.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    OpeningBook: The book, None if there is no valid book file.
+    """
+    global _default_book
+    if _default_book is None and os.path.exists(DEFAULT_BOOK_PATH):
+        try:
+            _default_book = OpeningBook(DEFAULT_BOOK_PATH)
+        except ValueError:
+            return None
+    return _default_book
+
+
+def best_move(own_mask, other_mask, rng=random):
+    """
+    Looks up a perfect move in the default book, solving the game instead
+    when there is no book file.
+
+    Parameters
+    ----------
+    own_mask (int): The marks of the player to move.
+    other_mask (int): The marks of the opponent.
+    rng (random.Random): The random number generator that picks between
+                         equally good moves.
+
+    Returns
+    -------
+    index (int): The index of the cell to play.
+    """
+    book = default_book()
+    if book is not None:
+        move = book.best_move(own_mask, other_mask, rng)
+        if move is not None:
+            return move
+    return solver.best_move(own_mask, other_mask, rng)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Write the opening book used by the perfect AI."
+    )
+    parser.add_argument("path", nargs="?", default=DEFAULT_BOOK_PATH)
+    args = parser.parse_args()
+    count = write_book(args.path)
+    print(f"Wrote {count} positions to {args.path}")
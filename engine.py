@@ -0,0 +1,643 @@
+EMPTY = ""
+
+PLAYER_SYMBOLS = ("X", "O")
+
+
+def generate_lines(size, win_length):
+    """
+    Generates every line of win_length cells on a size x size board.
+
+    Parameters
+    ----------
+    size (int): The number of rows and columns of the board.
+    win_length (int): The number of marks in a row needed to win.
+
+    Returns
+    -------
+    lines (tuple): Tuples of cell indices, rows first, then columns,
+                   diagonals and anti-diagonals.
+
+    Raises
+    ------
+    ValueError: If the win length doesn't fit on the board.
+    """
+    if not 1 <= win_length <= size:
+        raise ValueError(f"Can't get {win_length} in a row on a {size}x{size} board")
+    lines = []
+    # Each direction as (row step, column step)
+    for row_step, column_step in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        for row in range(size):
+            for column in range(size):
+                end_row = row + row_step * (win_length - 1)
+                end_column = column + column_step * (win_length - 1)
+                if 0 <= end_row < size and 0 <= end_column < size:
+                    lines.append(
+                        tuple(
+                            (row + row_step * i) * size + column + column_step * i
+                            for i in range(win_length)
+                        )
+                    )
+    return tuple(lines)
+
+
+WINNING_CONDITIONS = generate_lines(3, 3)
+
+# Bitmask of each winning condition, bit i is set if cell i is on the line
+LINE_MASKS = tuple(sum(1 << i for i in condition) for condition in WINNING_CONDITIONS)
+
+# The line masks going through each cell, so only the lines touched by the
+# last move need to be checked
+CELL_LINE_MASKS = tuple(
+    tuple(mask for mask in LINE_MASKS if mask >> index & 1) for index in range(9)
+)
+
+FULL_MASK = (1 << 9) - 1
+
+# Lines of the boards that were already created, keyed by (size, win_length)
+_line_cache = {}
+
+
+def board_lines(size, win_length):
+    """
+    Returns the lines of a board and the lines going through each cell,
+    generating them only once per board shape.
+
+    Parameters
+    ----------
+    size (int): The number of rows and columns of the board.
+    win_length (int): The number of marks in a row needed to win.
+
+    Returns
+    -------
+    lines (tuple): Tuples of the cell indices of every line.
+    cell_lines (tuple): For every cell, the indices of the lines through it.
+    """
+    key = (size, win_length)
+    if key not in _line_cache:
+        lines = generate_lines(size, win_length)
+        cell_lines = [[] for _ in range(size * size)]
+        for line_number, line in enumerate(lines):
+            for index in line:
+                cell_lines[index].append(line_number)
+        _line_cache[key] = (lines, tuple(tuple(cell) for cell in cell_lines))
+    return _line_cache[key]
+
+
+class GameState:
+    """
+    The position of a game as a small value: the marks of both sides as
+    masks, the side to move and the number of moves played. Moves are made
+    and taken back in place, so a search can walk millions of positions
+    without creating objects.
+
+    Attributes
+    ----------
+    x_mask (int): The marks of "X", bit i is set if "X" is in cell i.
+    o_mask (int): The marks of "O", bit i is set if "O" is in cell i.
+    side (int): The side to move, 0 for "X", 1 for "O".
+    ply (int): The number of moves played.
+
+    Methods
+    ----------
+    make_move(): Places a mark of the side to move and passes the turn.
+
+    undo_move(): Takes a move back and gives the turn back.
+
+    symbol_to_move(): Returns the symbol of the side to move.
+
+    mask(): Returns the marks of a side.
+
+    occupied(): Returns a mask of all marks.
+
+    copy(): Returns an independent copy of the state.
+    """
+
+    __slots__ = ("x_mask", "o_mask", "side", "ply")
+
+    def __init__(self, x_mask=0, o_mask=0, side=0, ply=0):
+        """
+        Initializes a new game state, the empty board with "X" to move by
+        default.
+
+        Parameters
+        ----------
+        x_mask (int): The marks of "X".
+        o_mask (int): The marks of "O".
+        side (int): The side to move, 0 for "X", 1 for "O".
+        ply (int): The number of moves played.
+        """
+        self.x_mask = x_mask
+        self.o_mask = o_mask
+        self.side = side
+        self.ply = ply
+
+    def make_move(self, index):
+        """
+        Places a mark of the side to move and passes the turn. The cell
+        isn't checked, that is up to the caller.
+
+        Parameters
+        ----------
+        index (int): The index of an empty cell.
+
+        Returns
+        -------
+        None
+        """
+        if self.side:
+            self.o_mask |= 1 << index
+        else:
+            self.x_mask |= 1 << index
+        self.side ^= 1
+        self.ply += 1
+
+    def undo_move(self, index):
+        """
+        Takes back a move made with make_move() and gives the turn back.
+
+        Parameters
+        ----------
+        index (int): The index of the cell the last move was played in.
+
+        Returns
+        -------
+        None
+        """
+        self.side ^= 1
+        self.ply -= 1
+        if self.side:
+            self.o_mask ^= 1 << index
+        else:
+            self.x_mask ^= 1 << index
+
+    def symbol_to_move(self):
+        """
+        Returns the symbol of the side to move.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        str: Either "X" or "O".
+        """
+        return PLAYER_SYMBOLS[self.side]
+
+    def mask(self, side):
+        """
+        Returns the marks of a side.
+
+        Parameters
+        ----------
+        side (int): 0 for "X", 1 for "O".
+
+        Returns
+        -------
+        int: A mask with bit i set if the side is in cell i.
+        """
+        return self.o_mask if side else self.x_mask
+
+    def occupied(self):
+        """
+        Returns a mask of all marks.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        int: A mask with bit i set if cell i is taken.
+        """
+        return self.x_mask | self.o_mask
+
+    def copy(self):
+        """
+        Returns an independent copy of the state.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        GameState: A state with the same marks, side to move and ply.
+        """
+        return GameState(self.x_mask, self.o_mask, self.side, self.ply)
+
+    def __eq__(self, other):
+        if not isinstance(other, GameState):
+            return NotImplemented
+        return (
+            self.x_mask == other.x_mask
+            and self.o_mask == other.o_mask
+            and self.side == other.side
+        )
+
+    def __hash__(self):
+        return hash((self.x_mask, self.o_mask, self.side))
+
+    def __repr__(self):
+        return (
+            f"GameState(x_mask={self.x_mask:#x}, o_mask={self.o_mask:#x}, "
+            f"side={self.side}, ply={self.ply})"
+        )
+
+
+class GameBoard:
+    """
+    Represents the state of a Tic Tac Toe board without any Tkinter widgets.
+    The GUI only renders this state, which lets the rules and the AI run
+    headless.
+
+    Attributes
+    ----------
+    size (int): The number of rows and columns of the board.
+    win_length (int): The number of marks in a row needed to win.
+    lines (tuple): The cell indices of every line that wins the game.
+    cell_lines (tuple): For every cell, the indices of the lines through it.
+    cells (list): The symbol in each cell, EMPTY if the cell is free.
+    moves (list): The cell indices in the order they were played.
+    state (GameState): The marks of both symbols as masks, the side to move
+                       and the number of moves played.
+    line_counts (dict): Per symbol, the number of its marks on every line.
+    free_mask (int): A mask with bit i set if cell i is empty.
+    line_free_sums (list): The sum of the indices of the empty cells of every
+                           line, the empty cell itself if only one is left.
+    winning_symbol (str): The symbol that completed a line, None if nobody did yet.
+
+    Methods
+    ----------
+    reset(): Clears the board for a new game.
+
+    copy(): Returns an independent snapshot of the board.
+
+    is_free(): Checks if a cell can still be played.
+
+    free_cells(): Returns the indices of all empty cells.
+
+    random_free_cell(): Picks a random empty cell.
+
+    place(): Places a symbol in a cell.
+
+    undo(): Takes back the last move.
+
+    winning_moves(): Returns the cells that complete a line for a symbol.
+
+    fork_moves(): Returns the cells that give a symbol two winning moves at once.
+
+    winner(): Returns the symbol that completed a line, if any.
+
+    is_full(): Checks if all cells are taken.
+
+    is_over(): Checks if the game has been won or drawn.
+    """
+
+    def __init__(self, size=3, win_length=3):
+        """
+        Initializes a new, empty game board.
+
+        Parameters
+        ----------
+        size (int): The number of rows and columns of the board.
+        win_length (int): The number of marks in a row needed to win.
+        """
+        self.size = size
+        self.win_length = win_length
+        self.lines, self.cell_lines = board_lines(size, win_length)
+        self.reset()
+
+    def reset(self, starting_symbol=PLAYER_SYMBOLS[0]):
+        """
+        Clears the board for a new game.
+
+        Parameters
+        ----------
+        starting_symbol (str): The symbol that makes the first move.
+
+        Returns
+        -------
+        None
+        """
+        cell_count = self.size * self.size
+        self.cells = [EMPTY] * cell_count
+        self.moves = []
+        self.state = GameState(side=PLAYER_SYMBOLS.index(starting_symbol))
+        self.line_counts = {symbol: [0] * len(self.lines) for symbol in PLAYER_SYMBOLS}
+        self.free_mask = (1 << cell_count) - 1
+        self.line_free_sums = [sum(line) for line in self.lines]
+        self.winning_symbol = None
+        # The empty cells in no particular order and where each one is in
+        # that list, so a cell can be removed by swapping it with the last one
+        self._free_list = list(range(cell_count))
+        self._free_positions = list(range(cell_count))
+        # Per symbol, the empty cells that complete a line, with the number
+        # of lines they complete
+        self._winning_cells = {symbol: {} for symbol in PLAYER_SYMBOLS}
+        if self.win_length == 1:
+            for symbol in PLAYER_SYMBOLS:
+                self._winning_cells[symbol] = {
+                    index: len(lines) for index, lines in enumerate(self.cell_lines)
+                }
+
+    def copy(self):
+        """
+        Returns an independent snapshot of the board, so the AI can think
+        about it while the game goes on.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        GameBoard: A board with the same marks.
+        """
+        board = GameBoard.__new__(GameBoard)
+        board.__dict__.update(self.__dict__)
+        board.cells = list(self.cells)
+        board.moves = list(self.moves)
+        board.state = self.state.copy()
+        board.line_counts = {
+            symbol: list(counts) for symbol, counts in self.line_counts.items()
+        }
+        board.line_free_sums = list(self.line_free_sums)
+        board._free_list = list(self._free_list)
+        board._free_positions = list(self._free_positions)
+        board._winning_cells = {
+            symbol: dict(cells) for symbol, cells in self._winning_cells.items()
+        }
+        return board
+
+    def is_free(self, index):
+        """
+        Checks if a cell can still be played.
+
+        Parameters
+        ----------
+        index (int): The index of the cell.
+
+        Returns
+        -------
+        bool: True if the cell is empty.
+        """
+        return self.free_mask >> index & 1 == 1
+
+    def free_cells(self):
+        """
+        Returns the indices of all empty cells.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        tuple: The indices of the empty cells, in no particular order.
+        """
+        return tuple(self._free_list)
+
+    def random_free_cell(self, rng):
+        """
+        Picks a random empty cell in constant time.
+
+        Parameters
+        ----------
+        rng (random.Random): The random number generator to use.
+
+        Returns
+        -------
+        index (int): The index of the cell, None if the board is full.
+        """
+        if self._free_list:
+            return self._free_list[rng.randrange(len(self._free_list))]
+
+    def place(self, index, symbol):
+        """
+        Places a symbol in a cell.
+
+        Parameters
+        ----------
+        index (int): The index of the cell.
+        symbol (str): The symbol to place (either "X" or "O").
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        ValueError: If the cell is already taken or it isn't the symbol's turn.
+        """
+        if not self.is_free(index):
+            raise ValueError(f"Cell {index} is already taken")
+        state = self.state
+        if symbol != PLAYER_SYMBOLS[state.side]:
+            raise ValueError(f"It's not {symbol}'s turn")
+        state.make_move(index)
+        self.cells[index] = symbol
+        self.moves.append(index)
+        self.free_mask ^= 1 << index
+
+        # Swap the cell with the last free cell and drop it
+        position = self._free_positions[index]
+        last_cell = self._free_list.pop()
+        if last_cell != index:
+            self._free_list[position] = last_cell
+            self._free_positions[last_cell] = position
+
+        # Only the lines through the new mark change, which also keeps the
+        # winning cells of both symbols up to date
+        other_symbol = PLAYER_SYMBOLS[symbol == PLAYER_SYMBOLS[0]]
+        own_counts = self.line_counts[symbol]
+        other_counts = self.line_counts[other_symbol]
+        line_free_sums = self.line_free_sums
+        win_length = self.win_length
+        needed = win_length - 1
+        for line_number in self.cell_lines[index]:
+            own = own_counts[line_number] + 1
+            own_counts[line_number] = own
+            line_free_sums[line_number] -= index
+            other = other_counts[line_number]
+            if other == 0:
+                if own == needed:
+                    # The last empty cell of the line now wins it
+                    winning_cells = self._winning_cells[symbol]
+                    cell = line_free_sums[line_number]
+                    winning_cells[cell] = winning_cells.get(cell, 0) + 1
+                elif own == win_length:
+                    self.winning_symbol = symbol
+                    _count_cell(self._winning_cells[symbol], index, -1)
+            if own == 1 and other == needed:
+                # The opponent can't win this line here anymore
+                _count_cell(self._winning_cells[other_symbol], index, -1)
+
+    def undo(self):
+        """
+        Takes back the last move.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        index (int): The cell that was emptied.
+
+        Raises
+        ------
+        IndexError: If no move was played.
+        """
+        index = self.moves.pop()
+        symbol = self.cells[index]
+        self.cells[index] = EMPTY
+        self.state.undo_move(index)
+        self.free_mask |= 1 << index
+        self._free_positions[index] = len(self._free_list)
+        self._free_list.append(index)
+
+        other_symbol = PLAYER_SYMBOLS[symbol == PLAYER_SYMBOLS[0]]
+        own_counts = self.line_counts[symbol]
+        other_counts = self.line_counts[other_symbol]
+        line_free_sums = self.line_free_sums
+        needed = self.win_length - 1
+        for line_number in self.cell_lines[index]:
+            own = own_counts[line_number]
+            other = other_counts[line_number]
+            if other == 0:
+                if own == self.win_length:
+                    _count_cell(self._winning_cells[symbol], index, 1)
+                elif own == needed:
+                    _count_cell(
+                        self._winning_cells[symbol], line_free_sums[line_number], -1
+                    )
+            if own == 1 and other == needed:
+                _count_cell(self._winning_cells[other_symbol], index, 1)
+            own_counts[line_number] = own - 1
+            line_free_sums[line_number] += index
+        # A win by this move is gone, a line completed earlier may remain
+        if self.winning_symbol == symbol and self.win_length not in own_counts:
+            self.winning_symbol = None
+            if self.win_length in other_counts:
+                self.winning_symbol = other_symbol
+        return index
+
+    def winning_moves(self, symbol):
+        """
+        Returns the empty cells that complete a line for a symbol.
+
+        Parameters
+        ----------
+        symbol (str): The symbol to check (either "X" or "O").
+
+        Returns
+        -------
+        tuple: The cells, in no particular order.
+        """
+        return tuple(self._winning_cells[symbol])
+
+    def fork_moves(self, symbol):
+        """
+        Returns the empty cells that give a symbol two or more winning moves
+        at once, which the opponent can't both block. The free cells are
+        checked on every call, only through the lines kept up to date by
+        place().
+
+        Parameters
+        ----------
+        symbol (str): The symbol to check (either "X" or "O").
+
+        Returns
+        -------
+        tuple: The cells, in no particular order.
+        """
+        # Lines this far from complete without opposing marks become winning
+        # lines when the symbol plays on them
+        needed = self.win_length - 2
+        if needed < 0:
+            return ()
+        own_counts = self.line_counts[symbol]
+        other_counts = self.line_counts[PLAYER_SYMBOLS[symbol == PLAYER_SYMBOLS[0]]]
+        line_free_sums = self.line_free_sums
+        winning_cells = self._winning_cells[symbol]
+        forks = []
+        for index in self._free_list:
+            # Overlapping lines can leave the same cell to win, so the
+            # winning cells are counted rather than the lines
+            threats = set()
+            for line_number in self.cell_lines[index]:
+                if own_counts[line_number] == needed and other_counts[line_number] == 0:
+                    # The other empty cell of the line
+                    threats.add(line_free_sums[line_number] - index)
+            if not threats:
+                continue
+            threats.update(winning_cells)
+            threats.discard(index)
+            if len(threats) >= 2:
+                forks.append(index)
+        return tuple(forks)
+
+    def winner(self):
+        """
+        Returns the symbol that completed a line, if any.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        symbol (str): The winning symbol, or None if nobody won.
+        """
+        return self.winning_symbol
+
+    def is_full(self):
+        """
+        Checks if all cells are taken.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        bool: True if no empty cells are left.
+        """
+        return self.free_mask == 0
+
+    def is_over(self):
+        """
+        Checks if the game has been won or drawn.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        bool: True if the game is finished.
+        """
+        return self.winning_symbol is not None or self.is_full()
+
+
+def _count_cell(cell_counts, index, sign):
+    """
+    Adds to the number of lines counted for a cell, dropping cells that
+    reach zero.
+
+    Parameters
+    ----------
+    cell_counts (dict): The number of lines per cell.
+    index (int): The cell.
+    sign (int): 1 or -1.
+
+    Returns
+    -------
+    None
+    """
+    count = cell_counts.get(index, 0) + sign
+    if count:
+        cell_counts[index] = count
+    else:
+        del cell_counts[index]
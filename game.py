@@ -1,9 +1,17 @@
 import tkinter as tk
 from tkinter import messagebox
+import queue
 import random
+import threading
+import time
+from functools import partial
 from board import TicTacToeBoard
 from player import Player
 from ai import ComputerPlayer
+from engine import GameBoard
+from instrument import Instrumentation
+from records import record_from_board
+from strategies import get_strategy, strategy_names
 
 # Common styling options for buttons
 BUTTON_STYLE = {
@@ -17,9 +25,11 @@ LABEL_STYLE = {"font": ("Helvetica", 26), "fg": "#D21404"}
 
 TWO_PLAYER_MODE = "two player"
 
-EASY_AI_MODE = "easy ai"
+# Milliseconds between checks if the computer player picked its move
+COMPUTER_POLL_INTERVAL = 10
 
-HARD_AI_MODE = "hard ai"
+# Height of a row of the new game window in pixels
+MENU_ROW_HEIGHT = 80
 
 
 class TicTacToeGame:
@@ -29,18 +39,29 @@ class TicTacToeGame:
     Attributes
     ----------
     master(tk.Tk): The main Tkinter window.
-    player_one_squares (list): List of cell indices marked by player one.
-    player_two_squares (list): List of cell indices marked by player two.
-    computer_squares (list): List of cell indices marked by the computer.
-    game_mode (str): String that indicates what mode the player chose.
-    someone_won (bool): Boolean that checks if the player won to prevent the
-                        computer taking another turn.
+    size (int): The number of rows and columns of the game board.
+    win_length (int): The number of marks in a row needed to win.
+    workers (int): The processes the MCTS AI searches in.
+    record_writer (RecordWriter): Logs every finished game, None to not log.
+    game_board (GameBoard): The widget-free state of the current game.
+    board (TicTacToeBoard): The game board widgets, reused for every game.
+    game_mode (str): String that indicates what mode the player chose, the
+                     name of the AI strategy in games against the AI.
+    computer_player (ComputerPlayer): The AI opponent of the current game.
+    computer_thinking (bool): Boolean that locks the board while the computer
+                              player picks its move.
+    computer_moves (queue.Queue): The moves computer players picked on their
+                                  worker threads.
+    instrumentation (Instrumentation): Times the phases of every turn,
+                                       disabled unless it has sinks.
+    turn_waits_for_render (bool): True while an ended turn is kept open until
+                                  the board it changed is rendered.
 
     Methods
     ----------
     __init__(): Initializes a new instance of the TicTacToeGame class.
 
-    main_menu(): Creates the main menu when the program gets opened or a game ends.
+    main_menu(): Shows the main menu when the program gets opened or a game ends.
 
     new_game(): Opens a window when the new game button gets clicked. Giving the
                 player an option to have a 2 player game, play against an easy
@@ -51,37 +72,80 @@ class TicTacToeGame:
 
     two_player_game(): Starts a 2 player game after this option gets chosen.
 
-    easy_ai_game(): Starts a game against an easy AI opponent.
-
-    hard_ai_game(): Starts a game against an hard AI opponent.
+    ai_game(): Starts a game against an AI opponent using a registered strategy.
 
     handle_turn(): Plays out a player turn once they press one of the buttons on the board.
 
-    check_winner(): After a turn check if 1 of the players won the game.
+    begin_turn(): Starts timing a turn.
+
+    end_turn(): Ends the timed turn once its render ran.
+
+    finish_render(): Renders the board and ends the turn waiting for it.
+
+    play_move(): Places a symbol on the game board and schedules rendering it.
+
+    check_winner(): After a turn check if 1 of the players won the game or if it's a draw.
+
+    record_game(): Logs the finished game.
+
+    decide_starting_player(): Randomly decides who starts the game.
+
+    handle_computer_turn(): Lets a computer player pick a square on a worker thread.
+
+    compute_computer_turn(): Picks the computer player's move on the worker thread.
+
+    poll_computer_turn(): Plays the computer player's move once it's picked.
+
+    cancel_computer_turn(): Drops the move the computer player is still picking.
     """
 
-    def __init__(self, master):
+    def __init__(
+        self,
+        master,
+        size=3,
+        win_length=3,
+        instrumentation=None,
+        workers=1,
+        record_writer=None,
+    ):
         """
         Initializes a new instance of the TicTacToeGame class.
 
         Parameters
         ----------
         master(tk.Tk): The main Tkinter window.
+        size (int): The number of rows and columns of the game board.
+        win_length (int): The number of marks in a row needed to win.
+        instrumentation (Instrumentation): Times the phases of every turn,
+                                           nothing is recorded by default.
+        workers (int): The processes the MCTS AI searches in, None for one
+                       per CPU.
+        record_writer (RecordWriter): Logs every finished game, None to not log.
         """
         self.master = master
         self.master.title("Tic Tac Toe")
         self.master.geometry("800x800")
-        self.current_player = "player_one"
-        self.player_one_squares = []
-        self.player_two_squares = []
-        self.computer_squares = []
+        self.size = size
+        self.win_length = win_length
+        self.workers = workers
+        self.record_writer = record_writer
+        self.game_board = GameBoard(size, win_length)
+        self.board = TicTacToeBoard(self.master)
+        self.computer_thinking = False
+        self.computer_moves = queue.Queue()
+        # Identifies the current computer turn, so moves of cancelled turns
+        # are ignored
+        self.computer_turn_id = 0
+        self.poll_job = None
+        self.instrumentation = instrumentation or Instrumentation()
+        self.turn_waits_for_render = False
         self.main_menu()
         self.game_mode = ""
-        self.someone_won = False
 
     def main_menu(self):
         """
-        Creates the main menu when the program gets opened or a game ends.
+        Shows the main menu when the program gets opened or a game ends. The
+        widgets are created once and shown again after every game.
 
         Parameters
         ----------
@@ -91,6 +155,11 @@ class TicTacToeGame:
         -------
         None
         """
+        if hasattr(self.master, "welcome_label"):
+            self.master.welcome_label.grid()
+            self.master.new_game_button.grid()
+            return
+
         self.master.welcome_label = tk.Label(
             text="Welcome to Tic Tac Toe!", **LABEL_STYLE
         )
@@ -105,8 +174,8 @@ class TicTacToeGame:
     def new_game(self):
         """
         Opens a window when the new game button gets clicked. Giving the
-        player an option to have a 2 player game, play against an easy
-        or hard AI.
+        player an option to have a 2 player game or play against any of the
+        registered AI strategies that can play on the board.
 
         Parameters
         ----------
@@ -117,11 +186,20 @@ class TicTacToeGame:
         None
         """
 
-        # Create new window
-        self.new_window = tk.Toplevel(self.master)
-        self.new_window.geometry("400x400")
         # Disable interaction with the main window
         self.master.attributes("-disabled", 1)
+
+        # Show the window again if it was already created for an earlier game
+        if hasattr(self, "new_window"):
+            self.new_window.deiconify()
+            self.new_window.grab_set()
+            return
+
+        # Create new window, with a row for the label, the 2 player button
+        # and every AI that can play on the board
+        difficulties = strategy_names(self.size)
+        self.new_window = tk.Toplevel(self.master)
+        self.new_window.geometry(f"400x{MENU_ROW_HEIGHT * (len(difficulties) + 2)}")
         # Make the new game window modal
         self.new_window.grab_set()
 
@@ -140,17 +218,16 @@ class TicTacToeGame:
         )
         self.two_players_button.grid(row=1, column=0, pady=(0, 20))
 
-        # Add Easy AI button
-        self.easy_ai_button = tk.Button(
-            self.new_window, text="Easy AI", **BUTTON_STYLE, command=self.easy_ai_game
-        )
-        self.easy_ai_button.grid(row=2, column=0, pady=(0, 20))
-
-        # Add Hard AI button
-        self.hard_ai_button = tk.Button(
-            self.new_window, text="Hard AI", **BUTTON_STYLE, command=self.hard_ai_game
-        )
-        self.hard_ai_button.grid(row=3, column=0, pady=(0, 20))
+        # Add a button per AI strategy
+        self.ai_buttons = {}
+        for row, difficulty in enumerate(difficulties, start=2):
+            self.ai_buttons[difficulty] = tk.Button(
+                self.new_window,
+                text=get_strategy(difficulty).label or difficulty,
+                **BUTTON_STYLE,
+                command=partial(self.ai_game, difficulty),
+            )
+            self.ai_buttons[difficulty].grid(row=row, column=0, pady=(0, 20))
 
         # Release the grab when the new game window is closed
         self.new_window.protocol("WM_DELETE_WINDOW", self.release_grab)
@@ -158,7 +235,8 @@ class TicTacToeGame:
     def release_grab(self):
         """
         Enables interaction with the main menu after the new game
-        window is closed
+        window is closed. The window is hidden to be shown again for the
+        next game.
 
         Parameters
         ----------
@@ -169,7 +247,8 @@ class TicTacToeGame:
         None
         """
         self.master.attributes("-disabled", 0)
-        self.new_window.destroy()
+        self.new_window.grab_release()
+        self.new_window.withdraw()
 
     def two_player_game(self):
         """
@@ -183,7 +262,6 @@ class TicTacToeGame:
         -------
         None
         """
-        self.board = TicTacToeBoard(self.master)
         self.game_mode = TWO_PLAYER_MODE
         self.player_one = Player(1)
         self.player_two = Player(2)
@@ -191,42 +269,23 @@ class TicTacToeGame:
         self.decide_starting_player()
         self.release_grab()
 
-    def easy_ai_game(self):
+    def ai_game(self, difficulty):
         """
-        Starts a game against an easy AI opponent
+        Starts a game against an AI opponent after its button gets clicked.
 
         Parameters
         ----------
-        None
+        difficulty (str): The name of a registered strategy.
 
         Returns
         -------
         None
         """
-        self.board = TicTacToeBoard(self.master)
-        self.game_mode = EASY_AI_MODE
+        self.game_mode = difficulty
         self.player_one = Player(1)
-        self.easy_ai = ComputerPlayer("easy")
-        self.board.create_board(self.player_one, game_instance=self)
-        self.decide_starting_player()
-        self.release_grab()
-
-    def hard_ai_game(self):
-        """
-        Starts a game against an hard AI opponent
-
-        Parameters
-        ----------
-        None
-
-        Returns
-        -------
-        None
-        """
-        self.board = TicTacToeBoard(self.master)
-        self.game_mode = HARD_AI_MODE
-        self.player_one = Player(1)
-        self.hard_ai = ComputerPlayer("hard")
+        self.computer_player = ComputerPlayer(
+            difficulty, size=self.size, workers=self.workers
+        )
         self.board.create_board(self.player_one, game_instance=self)
         self.decide_starting_player()
         self.release_grab()
@@ -244,48 +303,80 @@ class TicTacToeGame:
         -------
         None
         """
-        if self.board.buttons[num].cget("text") != "":
+        # Ignore clicks while the computer player picks its move
+        if self.computer_thinking:
+            return
+        instrumentation = self.instrumentation
+        # The board knows whose turn it is
+        symbol = self.game_board.state.symbol_to_move()
+        self.begin_turn(symbol)
+        with instrumentation.phase("validate"):
+            is_free = self.game_board.is_free(num)
+        if not is_free:
+            instrumentation.count("rejected_clicks")
+            self.end_turn()
             messagebox.showwarning("Cell Taken", "Please select an empty cell")
             return
 
         # Handle player one turn
-        if self.current_player == "player_one":
-            self.board.buttons[num].config(
-                text="X", font=("Helvetica", 73), width=3, height=1, fg="red"
-            )
-            self.player_one_squares.append(num)
-            self.check_winner()
+        if symbol == "X":
+            self.play_move(num, "X")
+            if self.check_winner():
+                self.end_turn()
+                return
             # Set turn label to player 2's turn
             if self.game_mode == TWO_PLAYER_MODE:
-                self.current_player = "player_two"
-                self.board.change_turn_label(self.player_two.player_name)
-            # Make the easy or hard ai play its turn
-            elif self.game_mode == EASY_AI_MODE:
-                self.handle_computer_turn(self.easy_ai)
-                self.check_winner()
-            elif self.game_mode == HARD_AI_MODE:
-                self.handle_computer_turn(
-                    self.hard_ai, player_squares=self.player_one_squares
-                )
-                self.check_winner()
+                with instrumentation.phase("render"):
+                    self.board.change_turn_label(self.player_two.player_name)
+            # Make the ai play its turn
+            else:
+                self.handle_computer_turn(self.computer_player)
         # Handle player two turn
-        elif self.current_player == "player_two":
-            self.board.buttons[num].config(
-                text="O", font=("Helvetica", 73), width=3, height=1, fg="blue"
-            )
-            self.current_player = "player_one"
-            self.player_two_squares.append(num)
-            self.board.change_turn_label(self.player_one.player_name)
+        elif self.game_mode == TWO_PLAYER_MODE:
+            self.play_move(num, "O")
+            with instrumentation.phase("render"):
+                self.board.change_turn_label(self.player_one.player_name)
             self.check_winner()
+        self.end_turn()
 
-        # Show a pop up indicating a draw if all squares are taken and no one won yet
-        if self.draw and self.someone_won == False:
-            messagebox.showinfo("Draw", "It's a draw!")
-            self.board.remove_gameboard()
+    def begin_turn(self, symbol):
+        """
+        Starts timing a turn, first rendering the board for the turn before
+        if it still waits for that.
 
-    def check_winner(self):
+        Parameters
+        ----------
+        symbol (str): The symbol of the player whose turn it is.
+
+        Returns
+        -------
+        None
+        """
+        self.finish_render()
+        self.instrumentation.begin_turn(symbol)
+
+    def end_turn(self):
+        """
+        Ends the timed turn. If the board it changed isn't rendered yet the
+        turn stays open until it is, so the render is timed with it.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
         """
-        Checks if the player who just had a turn won the game.
+        if self.board.render_pending():
+            self.turn_waits_for_render = True
+        else:
+            self.instrumentation.end_turn()
+
+    def finish_render(self):
+        """
+        Renders the changes of the board that are still pending and ends the
+        turn that waits for them.
 
         Parameters
         ----------
@@ -295,36 +386,94 @@ class TicTacToeGame:
         -------
         None
         """
-        winning_conditions = [
-            (0, 1, 2),
-            (3, 4, 5),
-            (6, 7, 8),
-            (0, 3, 6),
-            (1, 4, 7),
-            (2, 5, 8),
-            (0, 4, 8),
-            (2, 4, 6),
-        ]
-
-        # Check if all squares are taken
-        self.draw = all(button.cget("text") != "" for button in self.board.buttons)
-
-        # Check if one of the 2 players or the AI won the game their last turn
-        for row in winning_conditions:
-            if all(num in self.player_one_squares for num in row):
+        with self.instrumentation.phase("render"):
+            self.board.render_now()
+        if self.turn_waits_for_render:
+            self.turn_waits_for_render = False
+            self.instrumentation.end_turn()
+
+    def play_move(self, num, symbol):
+        """
+        Places a symbol on the game board and schedules rendering it, so
+        the widgets are updated once the window is idle.
+
+        Parameters
+        ----------
+        num (int): The index of the selected square.
+        symbol (str): The symbol to place (either "X" or "O").
+
+        Returns
+        -------
+        None
+        """
+        with self.instrumentation.phase("place"):
+            self.game_board.place(num, symbol)
+        # Timed when it runs, see finish_render()
+        self.board.render()
+
+    def check_winner(self):
+        """
+        Checks if the player who just had a turn won the game or if the game
+        ended in a draw, and returns to the main menu if so.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        bool: True if the game is over.
+        """
+        with self.instrumentation.phase("win_check"):
+            winner = self.game_board.winner()
+            is_draw = winner is None and self.game_board.is_full()
+        if winner is None and not is_draw:
+            return False
+        self.record_game()
+
+        # Show the last mark before the pop up
+        with self.instrumentation.phase("render"):
+            self.board.render_now()
+        with self.instrumentation.phase("popup"):
+            if winner == "X":
                 messagebox.showinfo("Winner", f"{self.player_one.player_name} Wins")
-                self.someone_won = True
-                self.board.remove_gameboard()
-            elif all(num in self.player_two_squares for num in row):
+            elif winner == "O" and self.game_mode == TWO_PLAYER_MODE:
                 messagebox.showinfo("Winner", f"{self.player_two.player_name} Wins")
-                self.someone_won = True
-                self.board.remove_gameboard()
-            elif all(num in self.computer_squares for num in row):
+            elif winner == "O":
                 messagebox.showinfo("Winner", "The AI Wins")
-                self.someone_won = True
-                self.board.remove_gameboard()
+            # Show a pop up indicating a draw if all squares are taken and no one won
+            else:
+                messagebox.showinfo("Draw", "It's a draw!")
+
+        with self.instrumentation.phase("render"):
+            self.board.remove_gameboard()
+        return True
+
+    def record_game(self):
+        """
+        Logs the finished game if there is a record writer.
+
+        Parameters
+        ----------
+        None
 
-        self.someone_won = False
+        Returns
+        -------
+        None
+        """
+        if self.record_writer is None:
+            return
+        if self.game_mode == TWO_PLAYER_MODE:
+            player_o = self.player_two.player_name
+            difficulty = ""
+        else:
+            player_o = "AI"
+            difficulty = self.game_mode
+        self.record_writer.append(
+            record_from_board(
+                self.game_board, self.player_one.player_name, player_o, difficulty
+            )
+        )
 
     def decide_starting_player(self):
         """
@@ -340,35 +489,130 @@ class TicTacToeGame:
         """
         if self.game_mode == TWO_PLAYER_MODE:
             starting_player = random.choice(["player_one", "player_two"])
-            self.current_player = starting_player
-            if self.current_player == "player_two":
+            if starting_player == "player_two":
+                self.game_board.reset("O")
                 self.board.change_turn_label(self.player_two.player_name)
         else:
             starting_player = random.choice(["player_one", "AI"])
             if starting_player == "AI":
-                if self.game_mode == EASY_AI_MODE:
-                    self.handle_computer_turn(self.easy_ai)
-                elif self.game_mode == HARD_AI_MODE:
-                    self.hard_ai.is_starting_player = True
-                    self.handle_computer_turn(
-                        self.hard_ai, player_squares=self.player_one_squares
-                    )
+                self.game_board.reset("O")
+                self.handle_computer_turn(self.computer_player)
 
-    def handle_computer_turn(self, computer_player, player_squares=None):
+    def handle_computer_turn(self, computer_player):
         """
-        Handles the turn of a computer player.
+        Handles the turn of a computer player. The move gets picked on a
+        worker thread against a snapshot of the board, so the window keeps
+        responding while the computer thinks.
 
         Parameters
         ----------
-        computer_player (ComputerPlayer): The computer player object (either easy_ai or hard_ai).
-        player_squares (list): List of cell indices marked by the human player.
+        computer_player (ComputerPlayer): The computer player object.
 
         Returns
         -------
         None
         """
-        computer_player.computer_turn = True
-        number = computer_player.handle_turn(
-            self.board.buttons, self.someone_won, player_squares
+        # The computer's move is recorded as a turn of its own
+        self.end_turn()
+        self.computer_thinking = True
+        self.computer_turn_id += 1
+        worker = threading.Thread(
+            target=self.compute_computer_turn,
+            args=(computer_player, self.game_board.copy(), self.computer_turn_id),
+            daemon=True,
+        )
+        worker.start()
+        self.poll_job = self.master.after(
+            COMPUTER_POLL_INTERVAL, self.poll_computer_turn
         )
-        self.computer_squares.append(number)
+
+    def compute_computer_turn(self, computer_player, game_board, turn_id):
+        """
+        Picks the computer player's move on the worker thread and posts it
+        to the main thread, with the time it took and the search counters.
+
+        Parameters
+        ----------
+        computer_player (ComputerPlayer): The computer player object.
+        game_board (GameBoard): A snapshot of the game board.
+        turn_id (int): Identifies the turn the move is picked for.
+
+        Returns
+        -------
+        None
+        """
+        start = time.perf_counter()
+        try:
+            number = computer_player.handle_turn(game_board)
+        except Exception as error:
+            number = error
+        seconds = time.perf_counter() - start
+        counters = {}
+        if self.instrumentation.enabled:
+            counters = computer_player.strategy.counters()
+        self.computer_moves.put((turn_id, number, seconds, counters))
+
+    def poll_computer_turn(self):
+        """
+        Plays the computer player's move once the worker thread picked it,
+        otherwise checks again a bit later. If picking the move failed, the
+        error is shown and the game ends.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        self.poll_job = None
+        while True:
+            try:
+                turn_id, number, seconds, counters = self.computer_moves.get_nowait()
+            except queue.Empty:
+                self.poll_job = self.master.after(
+                    COMPUTER_POLL_INTERVAL, self.poll_computer_turn
+                )
+                return
+            # Skip moves of turns that were cancelled
+            if turn_id == self.computer_turn_id:
+                break
+
+        self.computer_thinking = False
+        # The game can't go on without the computer's move, so it ends here
+        # instead of leaving a board nobody can play on
+        if isinstance(number, Exception):
+            messagebox.showerror(
+                "AI Error", f"The AI couldn't pick a move and the game ended: {number}"
+            )
+            self.board.remove_gameboard()
+            return
+        instrumentation = self.instrumentation
+        self.begin_turn("O")
+        instrumentation.add_time("ai_decision", seconds)
+        for name, amount in counters.items():
+            instrumentation.count(name, amount)
+        if number is not None:
+            self.play_move(number, "O")
+        self.check_winner()
+        self.end_turn()
+
+    def cancel_computer_turn(self):
+        """
+        Drops the move the computer player is still picking, for example
+        when the game board gets removed.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        self.computer_turn_id += 1
+        self.computer_thinking = False
+        if self.poll_job is not None:
+            self.master.after_cancel(self.poll_job)
+            self.poll_job = None
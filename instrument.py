@@ -0,0 +1,321 @@
+"""
+Opt-in timing of the phases of every turn, with pluggable sinks.
+
+A turn is recorded as the seconds spent per phase plus counters such as the
+number of positions the AI searched. Without sinks the instrumentation is
+disabled and every call returns right away.
+"""
+
+import json
+import time
+
+# The phases a turn is split into
+PHASES = ("validate", "place", "win_check", "ai_decision", "render", "popup")
+
+
+class _NullPhase:
+    """
+    Context manager that times nothing, used while instrumentation is off.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    """
+    Context manager that adds the time spent inside it to the current turn.
+    """
+
+    def __init__(self, turn, name):
+        self.turn = turn
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        phases = self.turn["phases"]
+        phases[self.name] = phases.get(self.name, 0) + (
+            time.perf_counter() - self.start
+        )
+        return False
+
+
+class Instrumentation:
+    """
+    Collects the phase timings and counters of turns and hands every
+    finished turn to its sinks.
+
+    Attributes
+    ----------
+    sinks (list): Objects with a record(turn) method that get every turn.
+    enabled (bool): True if there are sinks to record to.
+
+    Methods
+    ----------
+    begin_turn(): Starts recording a turn.
+
+    phase(): Times a phase of the current turn.
+
+    add_time(): Adds a duration measured elsewhere to a phase.
+
+    count(): Adds to a counter of the current turn.
+
+    end_turn(): Hands the current turn to the sinks.
+
+    close(): Closes the sinks.
+    """
+
+    def __init__(self, sinks=()):
+        """
+        Initializes a new instance of the Instrumentation class.
+
+        Parameters
+        ----------
+        sinks (iterable): The sinks to record to, none disables recording.
+        """
+        self.sinks = list(sinks)
+        self.enabled = bool(self.sinks)
+        self._turn = None
+        self._turn_number = 0
+
+    def begin_turn(self, symbol):
+        """
+        Starts recording a turn, dropping a turn that never ended.
+
+        Parameters
+        ----------
+        symbol (str): The symbol of the player whose turn it is.
+
+        Returns
+        -------
+        None
+        """
+        if not self.enabled:
+            return
+        self._turn_number += 1
+        self._turn = {
+            "turn": self._turn_number,
+            "symbol": symbol,
+            "phases": {},
+            "counters": {},
+        }
+
+    def phase(self, name):
+        """
+        Times a phase of the current turn.
+
+        Parameters
+        ----------
+        name (str): The name of the phase, one of PHASES.
+
+        Returns
+        -------
+        A context manager timing the code inside it.
+        """
+        if self._turn is None:
+            return _NULL_PHASE
+        return _Phase(self._turn, name)
+
+    def add_time(self, name, seconds):
+        """
+        Adds a duration measured elsewhere, like on a worker thread, to a
+        phase of the current turn.
+
+        Parameters
+        ----------
+        name (str): The name of the phase, one of PHASES.
+        seconds (float): The duration.
+
+        Returns
+        -------
+        None
+        """
+        if self._turn is not None:
+            phases = self._turn["phases"]
+            phases[name] = phases.get(name, 0) + seconds
+
+    def count(self, name, amount=1):
+        """
+        Adds to a counter of the current turn.
+
+        Parameters
+        ----------
+        name (str): The name of the counter.
+        amount (int): The amount to add.
+
+        Returns
+        -------
+        None
+        """
+        if self._turn is not None:
+            counters = self._turn["counters"]
+            counters[name] = counters.get(name, 0) + amount
+
+    def end_turn(self):
+        """
+        Hands the current turn to the sinks.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        if self._turn is None:
+            return
+        for sink in self.sinks:
+            sink.record(self._turn)
+        self._turn = None
+
+    def close(self):
+        """
+        Closes the sinks that hold resources.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        for sink in self.sinks:
+            if hasattr(sink, "close"):
+                sink.close()
+
+
+class HistogramSink:
+    """
+    Keeps the durations of every phase in memory to summarize them.
+
+    Attributes
+    ----------
+    durations (dict): The recorded seconds per phase.
+    counters (dict): The totals of the counters over all turns.
+
+    Methods
+    ----------
+    record(): Adds a turn.
+
+    summary(): Returns the count, p50, p99 and maximum of every phase.
+    """
+
+    def __init__(self):
+        """
+        Initializes a new, empty histogram.
+
+        Parameters
+        ----------
+        None
+        """
+        self.durations = {}
+        self.counters = {}
+
+    def record(self, turn):
+        """
+        Adds a turn.
+
+        Parameters
+        ----------
+        turn (dict): The phases and counters of the turn.
+
+        Returns
+        -------
+        None
+        """
+        for name, seconds in turn["phases"].items():
+            self.durations.setdefault(name, []).append(seconds)
+        for name, amount in turn["counters"].items():
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self):
+        """
+        Returns the count, p50, p99 and maximum of every phase.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        summary (dict): Per phase, a dict with the count and the durations
+                        in milliseconds.
+        """
+        summary = {}
+        for name, durations in self.durations.items():
+            ordered = sorted(durations)
+            summary[name] = {
+                "count": len(ordered),
+                "p50_ms": ordered[len(ordered) // 2] * 1000,
+                "p99_ms": ordered[min(len(ordered) - 1, len(ordered) * 99 // 100)]
+                * 1000,
+                "max_ms": ordered[-1] * 1000,
+            }
+        return summary
+
+
+class JsonLinesSink:
+    """
+    Writes every turn as a line of JSON to a file.
+
+    Attributes
+    ----------
+    path (str): The file to write to.
+
+    Methods
+    ----------
+    record(): Writes a turn.
+
+    close(): Closes the file.
+    """
+
+    def __init__(self, path):
+        """
+        Opens the file, appending to it if it exists.
+
+        Parameters
+        ----------
+        path (str): The file to write to.
+        """
+        self.path = path
+        self._file = open(path, "a")
+
+    def record(self, turn):
+        """
+        Writes a turn.
+
+        Parameters
+        ----------
+        turn (dict): The phases and counters of the turn.
+
+        Returns
+        -------
+        None
+        """
+        self._file.write(json.dumps(turn) + "\n")
+        self._file.flush()
+
+    def close(self):
+        """
+        Closes the file.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        self._file.close()
@@ -1,7 +1,59 @@
-import tkinter as tk
-from game import TicTacToeGame
+import argparse
+import json
+from instrument import HistogramSink, Instrumentation, JsonLinesSink
+from records import RecordWriter
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play Tic Tac Toe.")
+    parser.add_argument("--size", type=int, default=3, help="rows and columns")
+    parser.add_argument("--win-length", type=int, default=3, help="marks in a row")
+    parser.add_argument(
+        "-w", "--workers", type=int, default=1, help="processes of the MCTS AI"
+    )
+    parser.add_argument("--trace", help="write the timings of every turn to this file")
+    parser.add_argument(
+        "--timings", action="store_true", help="print turn timings on exit"
+    )
+    parser.add_argument("--record", help="append every finished game to this log")
+    parser.add_argument("--profile", help="write cProfile stats to this file")
+    args = parser.parse_args()
+    if not 1 <= args.win_length <= args.size:
+        parser.error("--win-length can't be bigger than --size")
+
+    sinks = []
+    if args.trace:
+        sinks.append(JsonLinesSink(args.trace))
+    if args.timings:
+        histogram = HistogramSink()
+        sinks.append(histogram)
+    instrumentation = Instrumentation(sinks)
+    record_writer = RecordWriter(args.record) if args.record else None
+
+    # The GUI modules are only loaded once the arguments are valid
+    import tkinter as tk
+    from game import TicTacToeGame
+
     root = tk.Tk()
-    app = TicTacToeGame(root)
-    root.mainloop()
+    app = TicTacToeGame(
+        root,
+        size=args.size,
+        win_length=args.win_length,
+        instrumentation=instrumentation,
+        workers=args.workers,
+        record_writer=record_writer,
+    )
+    if args.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.runcall(root.mainloop)
+        profiler.dump_stats(args.profile)
+    else:
+        root.mainloop()
+
+    instrumentation.close()
+    if record_writer is not None:
+        record_writer.close()
+    if args.timings:
+        print(json.dumps(histogram.summary(), indent=2))
+        print(json.dumps(histogram.counters, indent=2))
@@ -0,0 +1,351 @@
+import math
+import random
+import time
+from engine import PLAYER_SYMBOLS, GameState, board_lines
+from search import DEFAULT_TIME_LIMIT, MOVE_RADIUS
+
+# How much UCT favours moves that were tried less often
+EXPLORATION = math.sqrt(2)
+
+# Result of a finished game that nobody won
+DRAW = -1
+
+# Iterations between checks if the time is up
+TIME_CHECK_INTERVAL = 16
+
+
+class _Node:
+    """
+    A position in the search tree, reached by playing move.
+    """
+
+    __slots__ = (
+        "move",
+        "side",
+        "parent",
+        "children",
+        "untried",
+        "near_mask",
+        "result",
+        "visits",
+        "wins",
+    )
+
+    def __init__(self, move, side, parent, near_mask, untried, result):
+        self.move = move
+        # The side that played move, 0 for "X", 1 for "O"
+        self.side = side
+        self.parent = parent
+        self.children = {}
+        self.untried = untried
+        # The empty cells near marks, the moves worth expanding
+        self.near_mask = near_mask
+        # The side that won, DRAW or None if the game goes on
+        self.result = result
+        self.visits = 0
+        # Wins of side, draws count as half a win
+        self.wins = 0.0
+
+
+class MonteCarloTreeSearch:
+    """
+    Monte Carlo tree search with UCT selection and random rollouts. The tree
+    is kept between moves and re-rooted at the new position, so the
+    simulations of earlier moves aren't thrown away.
+
+    Attributes
+    ----------
+    size (int): The number of rows and columns of the board.
+    win_length (int): The number of marks in a row needed to win.
+    iterations (int): The number of simulations per move, None to simulate
+                      until the time limit.
+    exploration (float): The UCT exploration constant.
+    rng (random.Random): The random number generator of the rollouts.
+    simulations (int): The number of simulations run for the last move.
+    reused_visits (int): The visits of the root that were kept from
+                         earlier moves.
+
+    Methods
+    ----------
+    best_move(): Simulates games from the current position and returns the
+                 most visited move.
+
+    root_visits(): Returns how often each move of the last position was visited.
+    """
+
+    def __init__(
+        self, size, win_length, iterations=None, exploration=EXPLORATION, rng=None
+    ):
+        """
+        Initializes a new instance of the MonteCarloTreeSearch class.
+
+        Parameters
+        ----------
+        size (int): The number of rows and columns of the board.
+        win_length (int): The number of marks in a row needed to win.
+        iterations (int): The number of simulations per move, None to simulate
+                          until the time limit.
+        exploration (float): The UCT exploration constant.
+        rng (random.Random): The random number generator of the rollouts.
+        """
+        self.size = size
+        self.win_length = win_length
+        self.iterations = iterations
+        self.exploration = exploration
+        self.rng = rng or random.Random()
+        self.simulations = 0
+        self.reused_visits = 0
+        lines, cell_lines = board_lines(size, win_length)
+        line_masks = tuple(sum(1 << index for index in line) for line in lines)
+        self._cell_line_masks = tuple(
+            tuple(line_masks[line_number] for line_number in cell)
+            for cell in cell_lines
+        )
+        self._cell_count = size * size
+        self._full_mask = (1 << self._cell_count) - 1
+        self._neighbour_masks = tuple(
+            sum(
+                1 << (row * size + column)
+                for row in range(
+                    max(0, index // size - MOVE_RADIUS),
+                    min(size, index // size + MOVE_RADIUS + 1),
+                )
+                for column in range(
+                    max(0, index % size - MOVE_RADIUS),
+                    min(size, index % size + MOVE_RADIUS + 1),
+                )
+            )
+            for index in range(self._cell_count)
+        )
+        self._root = None
+        self._root_moves = ()
+
+    def best_move(self, game_board, symbol, time_limit=DEFAULT_TIME_LIMIT):
+        """
+        Simulates games from the current position and returns the most
+        visited move.
+
+        Parameters
+        ----------
+        game_board (GameBoard): The current state of the game board.
+        symbol (str): The symbol of the player to move.
+        time_limit (float): The time the search may take, in seconds, when
+                            no number of iterations is set.
+
+        Returns
+        -------
+        index (int): The cell to play.
+        """
+        state = game_board.state
+        root_state = GameState(
+            state.x_mask, state.o_mask, PLAYER_SYMBOLS.index(symbol), state.ply
+        )
+        root = self._reroot(game_board, root_state)
+        self.reused_visits = root.visits
+
+        deadline = time.perf_counter() + time_limit
+        self.simulations = 0
+        while True:
+            if self.iterations is not None:
+                if self.simulations >= self.iterations:
+                    break
+            elif (
+                self.simulations % TIME_CHECK_INTERVAL == 0
+                and self.simulations > 0
+                and time.perf_counter() > deadline
+            ):
+                break
+            self._simulate(root, root_state.copy())
+            self.simulations += 1
+
+        return max(root.children.values(), key=lambda child: child.visits).move
+
+    def root_visits(self):
+        """
+        Returns how often each move of the last searched position was visited.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        visits (dict): The visits per cell.
+        """
+        if self._root is None:
+            return {}
+        return {move: child.visits for move, child in self._root.children.items()}
+
+    def _reroot(self, game_board, state):
+        """
+        Finds the node of the current position in the kept tree, following
+        the moves played since the last search, or starts a new tree.
+
+        Parameters
+        ----------
+        game_board (GameBoard): The current state of the game board.
+        state (GameState): The position, with the side to move.
+
+        Returns
+        -------
+        root (_Node): The node of the current position.
+        """
+        moves = tuple(game_board.moves)
+        root = None
+        known = len(self._root_moves)
+        if self._root is not None and moves[:known] == self._root_moves:
+            root = self._root
+            for move in moves[known:]:
+                root = root.children.get(move)
+                if root is None:
+                    break
+        # The same moves with the other side starting are another position
+        if root is not None and root.side == state.side:
+            root = None
+        if root is None:
+            occupied = state.occupied()
+            if occupied:
+                near_mask = 0
+                for index in game_board.moves:
+                    near_mask |= self._neighbour_masks[index]
+                near_mask &= ~occupied
+            else:
+                near_mask = 1 << self._cell_count // 2
+            root = _Node(
+                None, 1 - state.side, None, near_mask, self._cells(near_mask), None
+            )
+        # Drop the rest of the old tree
+        root.parent = None
+        self._root = root
+        self._root_moves = moves
+        return root
+
+    def _cells(self, mask):
+        """
+        Returns the cells of a mask.
+
+        Parameters
+        ----------
+        mask (int): A mask with bit i set for cell i.
+
+        Returns
+        -------
+        cells (list): The indices of the set bits.
+        """
+        cells = []
+        while mask:
+            low_bit = mask & -mask
+            cells.append(low_bit.bit_length() - 1)
+            mask ^= low_bit
+        return cells
+
+    def _is_won(self, mask, move):
+        """
+        Checks if a move completed a line.
+
+        Parameters
+        ----------
+        mask (int): The marks of the side that played the move.
+        move (int): The cell that was played.
+
+        Returns
+        -------
+        bool: True if a line through the cell is complete.
+        """
+        for line_mask in self._cell_line_masks[move]:
+            if mask & line_mask == line_mask:
+                return True
+        return False
+
+    def _simulate(self, root, state):
+        """
+        Runs one simulation: selects a leaf with UCT, expands it, plays a
+        random game from it and backs the result up the tree.
+
+        Parameters
+        ----------
+        root (_Node): The node of the current position.
+        state (GameState): The position at the root, changed in place.
+
+        Returns
+        -------
+        None
+        """
+        node = root
+        exploration = self.exploration
+        # Selection
+        while not node.untried and node.children and node.result is None:
+            log_visits = math.log(node.visits)
+            node = max(
+                node.children.values(),
+                key=lambda child: child.wins / child.visits
+                + exploration * math.sqrt(log_visits / child.visits),
+            )
+            state.make_move(node.move)
+
+        # Expansion
+        if node.result is None and node.untried:
+            untried = node.untried
+            position = self.rng.randrange(len(untried))
+            move = untried[position]
+            untried[position] = untried[-1]
+            untried.pop()
+            side = state.side
+            state.make_move(move)
+            occupied = state.occupied()
+            if self._is_won(state.mask(side), move):
+                result = side
+            elif occupied == self._full_mask:
+                result = DRAW
+            else:
+                result = None
+            near_mask = (node.near_mask | self._neighbour_masks[move]) & ~occupied
+            child = _Node(
+                move,
+                side,
+                node,
+                near_mask,
+                self._cells(near_mask) if result is None else [],
+                result,
+            )
+            node.children[move] = child
+            node = child
+
+        # Simulation
+        result = node.result
+        if result is None:
+            result = self._rollout(state)
+
+        # Backpropagation
+        while node is not None:
+            node.visits += 1
+            if result == node.side:
+                node.wins += 1
+            elif result == DRAW:
+                node.wins += 0.5
+            node = node.parent
+
+    def _rollout(self, state):
+        """
+        Plays random moves until the game is over.
+
+        Parameters
+        ----------
+        state (GameState): The position to play from, changed in place.
+
+        Returns
+        -------
+        result (int): The side that won or DRAW.
+        """
+        free_cells = self._cells(self._full_mask & ~state.occupied())
+        self.rng.shuffle(free_cells)
+        make_move = state.make_move
+        cell_line_masks = self._cell_line_masks
+        for move in free_cells:
+            side = state.side
+            make_move(move)
+            mask = state.o_mask if side else state.x_mask
+            for line_mask in cell_line_masks[move]:
+                if mask & line_mask == line_mask:
+                    return side
+        return DRAW
@@ -0,0 +1,211 @@
+"""
+Root-parallel Monte Carlo tree search over a process pool.
+
+Every worker process grows its own tree from the current position and
+reports the visits of the root moves. The visits are added up and the most
+visited move is played. Each worker is a pool of one process, so every
+task of a move runs in a process of its own. The pools are created once
+and stay warm between moves, and positions are sent to them as a few bytes
+instead of pickled objects.
+"""
+
+import itertools
+import math
+import os
+import struct
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from engine import PLAYER_SYMBOLS, GameBoard
+from mcts import MonteCarloTreeSearch
+from search import DEFAULT_TIME_LIMIT
+
+# Board size, win length and side to move, followed by the moves as
+# 16-bit cell indices
+POSITION_HEADER = struct.Struct("<BBB")
+
+# Single-process pools by number of workers, shared by all players of the
+# process
+_pools = {}
+
+# The searches a worker process keeps a tree for
+MAX_WORKER_TREES = 64
+
+# The trees of a worker process, kept between moves per search and dropped
+# once they are the least recently used
+_worker_trees = OrderedDict()
+
+# Identifies the searches of this process to the workers
+_search_ids = itertools.count(1)
+
+
+def encode_position(game_board, symbol):
+    """
+    Packs a position into bytes for the worker processes.
+
+    Parameters
+    ----------
+    game_board (GameBoard): The current state of the game board.
+    symbol (str): The symbol of the player to move.
+
+    Returns
+    -------
+    bytes: The board shape, the side to move and the moves in order.
+    """
+    header = POSITION_HEADER.pack(
+        game_board.size, game_board.win_length, PLAYER_SYMBOLS.index(symbol)
+    )
+    return header + array("H", game_board.moves).tobytes()
+
+
+def decode_position(data):
+    """
+    Rebuilds a position packed by encode_position().
+
+    Parameters
+    ----------
+    data (bytes): The packed position.
+
+    Returns
+    -------
+    game_board (GameBoard): The position.
+    symbol (str): The symbol of the player to move.
+    """
+    size, win_length, side = POSITION_HEADER.unpack_from(data)
+    moves = array("H")
+    moves.frombytes(data[POSITION_HEADER.size :])
+    game_board = GameBoard(size, win_length)
+    # The sides took turns, so the parity of the moves tells who started
+    game_board.reset(PLAYER_SYMBOLS[side ^ len(moves) % 2])
+    for move in moves:
+        game_board.place(move, game_board.state.symbol_to_move())
+    return game_board, PLAYER_SYMBOLS[side]
+
+
+def _root_visits(search_id, data, time_limit, iterations):
+    """
+    Grows the tree of this worker process from a position and returns the
+    visits of its root moves.
+
+    Parameters
+    ----------
+    search_id (int): Identifies the search the tree belongs to.
+    data (bytes): The position packed by encode_position().
+    time_limit (float): The time the search may take, in seconds.
+    iterations (int): The number of simulations, None to use the time limit.
+
+    Returns
+    -------
+    visits (dict): The visits per root move.
+    simulations (int): The number of simulations that were run.
+    """
+    game_board, symbol = decode_position(data)
+    # Each search keeps its own tree, so games played at the same time
+    # don't replace each other's
+    tree_search = _worker_trees.get(search_id)
+    if tree_search is None:
+        tree_search = MonteCarloTreeSearch(game_board.size, game_board.win_length)
+        _worker_trees[search_id] = tree_search
+        if len(_worker_trees) > MAX_WORKER_TREES:
+            _worker_trees.popitem(last=False)
+    else:
+        _worker_trees.move_to_end(search_id)
+    tree_search.iterations = iterations
+    tree_search.best_move(game_board, symbol, time_limit)
+    return tree_search.root_visits(), tree_search.simulations
+
+
+def _warm_up():
+    """
+    Does nothing, submitted once per worker so the processes start early.
+    """
+
+
+def shared_pool(workers):
+    """
+    Returns a pool of one process per worker, starting the processes the
+    first time.
+
+    Parameters
+    ----------
+    workers (int): The number of worker processes.
+
+    Returns
+    -------
+    list: One ProcessPoolExecutor per worker, each with a single process.
+    """
+    if workers not in _pools:
+        pools = [ProcessPoolExecutor(max_workers=1) for _ in range(workers)]
+        for future in [pool.submit(_warm_up) for pool in pools]:
+            future.result()
+        _pools[workers] = pools
+    return _pools[workers]
+
+
+class ParallelTreeSearch:
+    """
+    Runs an independent Monte Carlo tree search in every worker process
+    and merges the visits of their root moves.
+
+    Attributes
+    ----------
+    workers (int): The number of worker processes.
+    iterations (int): The number of simulations per move over all workers,
+                      None to simulate until the time limit.
+    simulations (int): The number of simulations run for the last move.
+    search_id (int): Identifies the trees of this search in the workers.
+
+    Methods
+    ----------
+    best_move(): Searches in all workers and returns the most visited move.
+    """
+
+    def __init__(self, workers=None, iterations=None):
+        """
+        Initializes a new instance of the ParallelTreeSearch class.
+
+        Parameters
+        ----------
+        workers (int): The number of worker processes, one per CPU by default.
+        iterations (int): The number of simulations per move over all
+                          workers, None to simulate until the time limit.
+        """
+        self.workers = workers or os.cpu_count()
+        self.iterations = iterations
+        self.simulations = 0
+        self.search_id = next(_search_ids)
+
+    def best_move(self, game_board, symbol, time_limit=DEFAULT_TIME_LIMIT):
+        """
+        Searches in all workers and returns the most visited move.
+
+        Parameters
+        ----------
+        game_board (GameBoard): The current state of the game board.
+        symbol (str): The symbol of the player to move.
+        time_limit (float): The time the search may take, in seconds, when
+                            no number of iterations is set.
+
+        Returns
+        -------
+        index (int): The cell to play.
+        """
+        pools = shared_pool(self.workers)
+        data = encode_position(game_board, symbol)
+        iterations = self.iterations
+        if iterations is not None:
+            iterations = math.ceil(iterations / self.workers)
+        # One task per process, a process running two would search its tree
+        # twice and report its visits twice
+        futures = [
+            pool.submit(_root_visits, self.search_id, data, time_limit, iterations)
+            for pool in pools
+        ]
+        visits = {}
+        self.simulations = 0
+        for future in futures:
+            worker_visits, simulations = future.result()
+            for move, move_visits in worker_visits.items():
+                visits[move] = visits.get(move, 0) + move_visits
+            self.simulations += simulations
+        return max(visits, key=visits.get)
@@ -1,6 +1,3 @@
-from tkinter.simpledialog import askstring
-
-
 class Player:
     """
     A class to represent a player.
@@ -19,6 +16,9 @@ class Player:
         ----------
         number(int): The number the player gets assigned when creating an instance
         """
+        # Imported here, so the module loads without a display
+        from tkinter.simpledialog import askstring
+
         self.player_number = number
         self.player_name = askstring(
             "Name", f"What is the name of player {self.player_number}"
@@ -0,0 +1,455 @@
+"""
+Compact binary records of finished games.
+
+A log file starts with a header and holds one record per game: the names of
+both players, the difficulty, the board shape, who started and the moves.
+On boards of up to 16 cells every move is packed into a nibble. Records are
+appended in batches and read back with a generator, so a log of millions of
+games never has to fit in memory.
+"""
+
+import os
+import struct
+from engine import PLAYER_SYMBOLS, GameBoard
+
+# Magic bytes and format version at the start of every log file
+FILE_HEADER = struct.Struct("<4sH")
+MAGIC = b"TTTG"
+VERSION = 1
+
+# The length of the rest of the record
+RECORD_LENGTH = struct.Struct("<H")
+
+# Board size, win length, starting side and number of moves
+RECORD_HEADER = struct.Struct("<BBBH")
+
+# Records buffered before they are written to the file
+DEFAULT_BATCH_SIZE = 1000
+
+# Bytes read from the file at once when streaming records
+READ_SIZE = 1 << 16
+
+
+def _pack_moves(moves, cell_count):
+    """
+    Packs moves into bytes, two per byte on boards of up to 16 cells.
+
+    Parameters
+    ----------
+    moves (list): The cell indices in the order they were played.
+    cell_count (int): The number of cells of the board.
+
+    Returns
+    -------
+    bytes: The packed moves.
+    """
+    if cell_count <= 16:
+        packed = bytearray((len(moves) + 1) // 2)
+        for position, move in enumerate(moves):
+            packed[position // 2] |= move << (4 * (position % 2))
+        return bytes(packed)
+    if cell_count <= 256:
+        return bytes(moves)
+    return struct.pack(f"<{len(moves)}H", *moves)
+
+
+def _unpack_moves(data, count, cell_count):
+    """
+    Unpacks moves packed by _pack_moves().
+
+    Parameters
+    ----------
+    data (bytes): The packed moves.
+    count (int): The number of moves.
+    cell_count (int): The number of cells of the board.
+
+    Returns
+    -------
+    moves (list): The cell indices in the order they were played.
+    """
+    if cell_count <= 16:
+        return [
+            data[position // 2] >> (4 * (position % 2)) & 0xF
+            for position in range(count)
+        ]
+    if cell_count <= 256:
+        return list(data[:count])
+    return list(struct.unpack_from(f"<{count}H", data))
+
+
+class GameRecord:
+    """
+    The record of a single finished game.
+
+    Attributes
+    ----------
+    player_x (str): The name of the player using "X".
+    player_o (str): The name of the player using "O".
+    difficulty (str): The difficulty or game mode, empty if there was no AI.
+    starting_symbol (str): The symbol that made the first move.
+    size (int): The number of rows and columns of the board.
+    win_length (int): The number of marks in a row needed to win.
+    moves (list): The cell indices in the order they were played.
+
+    Methods
+    ----------
+    to_bytes(): Packs the record.
+
+    replay(): Plays the moves on a new game board.
+
+    to_dict(): Returns the record as a dict for JSON.
+    """
+
+    def __init__(
+        self,
+        player_x,
+        player_o,
+        difficulty,
+        starting_symbol,
+        moves,
+        size=3,
+        win_length=3,
+    ):
+        """
+        Initializes a new instance of the GameRecord class.
+
+        Parameters
+        ----------
+        player_x (str): The name of the player using "X".
+        player_o (str): The name of the player using "O".
+        difficulty (str): The difficulty or game mode.
+        starting_symbol (str): The symbol that made the first move.
+        moves (list): The cell indices in the order they were played.
+        size (int): The number of rows and columns of the board.
+        win_length (int): The number of marks in a row needed to win.
+        """
+        self.player_x = player_x
+        self.player_o = player_o
+        self.difficulty = difficulty
+        self.starting_symbol = starting_symbol
+        self.moves = list(moves)
+        self.size = size
+        self.win_length = win_length
+
+    def to_bytes(self):
+        """
+        Packs the record, including its length.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        bytes: The packed record.
+        """
+        body = RECORD_HEADER.pack(
+            self.size,
+            self.win_length,
+            PLAYER_SYMBOLS.index(self.starting_symbol),
+            len(self.moves),
+        )
+        for text in (self.player_x, self.player_o, self.difficulty):
+            # Cut at 255 bytes without splitting a character
+            encoded = text.encode()[:255].decode("utf-8", "ignore").encode()
+            body += bytes((len(encoded),)) + encoded
+        body += _pack_moves(self.moves, self.size * self.size)
+        return RECORD_LENGTH.pack(len(body)) + body
+
+    def replay(self):
+        """
+        Plays the moves on a new game board.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        game_board (GameBoard): The board after the last move.
+        """
+        game_board = GameBoard(self.size, self.win_length)
+        game_board.reset(self.starting_symbol)
+        for move in self.moves:
+            game_board.place(move, game_board.state.symbol_to_move())
+        return game_board
+
+    def to_dict(self):
+        """
+        Returns the record as a dict for JSON.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        dict: The fields of the record.
+        """
+        return {
+            "player_x": self.player_x,
+            "player_o": self.player_o,
+            "difficulty": self.difficulty,
+            "starting_symbol": self.starting_symbol,
+            "moves": self.moves,
+            "size": self.size,
+            "win_length": self.win_length,
+        }
+
+
+def record_from_board(game_board, player_x, player_o, difficulty=""):
+    """
+    Creates the record of a game board.
+
+    Parameters
+    ----------
+    game_board (GameBoard): The board of the finished game.
+    player_x (str): The name of the player using "X".
+    player_o (str): The name of the player using "O".
+    difficulty (str): The difficulty or game mode.
+
+    Returns
+    -------
+    GameRecord: The record.
+    """
+    # The sides took turns, so the parity of the moves tells who started
+    state = game_board.state
+    return GameRecord(
+        player_x,
+        player_o,
+        difficulty,
+        PLAYER_SYMBOLS[state.side ^ state.ply % 2],
+        game_board.moves,
+        game_board.size,
+        game_board.win_length,
+    )
+
+
+def unpack_record(data):
+    """
+    Unpacks a record packed by GameRecord.to_bytes(), without its length.
+
+    Parameters
+    ----------
+    data (bytes): The packed record after its length.
+
+    Returns
+    -------
+    GameRecord: The record.
+    """
+    size, win_length, starting_side, count = RECORD_HEADER.unpack_from(data)
+    offset = RECORD_HEADER.size
+    texts = []
+    for _ in range(3):
+        length = data[offset]
+        # Files written before names were cut on character boundaries may
+        # end a name in half a character
+        text = bytes(data[offset + 1 : offset + 1 + length])
+        texts.append(text.decode("utf-8", "replace"))
+        offset += 1 + length
+    moves = _unpack_moves(data[offset:], count, size * size)
+    return GameRecord(*texts, PLAYER_SYMBOLS[starting_side], moves, size, win_length)
+
+
+class RecordWriter:
+    """
+    Appends game records to a log file in batches.
+
+    Attributes
+    ----------
+    path (str): The log file.
+    batch_size (int): The number of records buffered before they are written.
+
+    Methods
+    ----------
+    append(): Adds a record, writing the batch once it is full.
+
+    append_bytes(): Adds records that are already packed.
+
+    flush(): Writes the buffered records.
+
+    close(): Writes the buffered records and closes the file.
+    """
+
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Opens a log file, writing its header if it is new.
+
+        Parameters
+        ----------
+        path (str): The log file.
+        batch_size (int): The number of records buffered before they are
+                          written.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "ab")
+        if is_new:
+            self._file.write(FILE_HEADER.pack(MAGIC, VERSION))
+        self._buffer = bytearray()
+        self._buffered = 0
+
+    def append(self, record):
+        """
+        Adds a record, writing the batch once it is full.
+
+        Parameters
+        ----------
+        record (GameRecord): The record.
+
+        Returns
+        -------
+        None
+        """
+        self.append_bytes(record.to_bytes())
+
+    def append_bytes(self, data, count=1):
+        """
+        Adds records that are already packed, for example by worker processes.
+
+        Parameters
+        ----------
+        data (bytes): The records packed by GameRecord.to_bytes().
+        count (int): The number of records in data.
+
+        Returns
+        -------
+        None
+        """
+        self._buffer += data
+        self._buffered += count
+        if self._buffered >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered records.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        self._file.write(self._buffer)
+        self._file.flush()
+        self._buffer.clear()
+        self._buffered = 0
+
+    def close(self):
+        """
+        Writes the buffered records and closes the file.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+def read_records(path, read_size=READ_SIZE):
+    """
+    Streams the records of a log file one at a time.
+
+    Parameters
+    ----------
+    path (str): The log file.
+    read_size (int): The number of bytes read from the file at once.
+
+    Returns
+    -------
+    A generator of GameRecord objects.
+
+    Raises
+    ------
+    ValueError: If the file isn't a game log of a supported version, or ends
+                in the middle of a record.
+    """
+    with open(path, "rb") as log_file:
+        header = log_file.read(FILE_HEADER.size)
+        if len(header) < FILE_HEADER.size or FILE_HEADER.unpack(header) != (
+            MAGIC,
+            VERSION,
+        ):
+            raise ValueError(f"{path} is not a version {VERSION} game log")
+        buffer = b""
+        while chunk := log_file.read(read_size):
+            buffer += chunk
+            view = memoryview(buffer)
+            offset = 0
+            while offset + RECORD_LENGTH.size <= len(buffer):
+                (length,) = RECORD_LENGTH.unpack_from(view, offset)
+                end = offset + RECORD_LENGTH.size + length
+                if end > len(buffer):
+                    break
+                yield unpack_record(view[offset + RECORD_LENGTH.size : end])
+                offset = end
+            view.release()
+            buffer = buffer[offset:]
+        if buffer:
+            raise ValueError(f"{path} ends in the middle of a record")
+
+
+def main():
+    """
+    Exports a game log to JSON lines or imports JSON lines into a game log.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+    """
+    import argparse
+    import json
+    import sys
+
+    parser = argparse.ArgumentParser(description="Convert Tic Tac Toe game logs.")
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("log", help="the game log file")
+    parser.add_argument(
+        "jsonl",
+        nargs="?",
+        help="the JSON lines file, standard input or output by default",
+    )
+    args = parser.parse_args()
+
+    if args.command == "export":
+        output_file = open(args.jsonl, "w") if args.jsonl else sys.stdout
+        try:
+            for record in read_records(args.log):
+                output_file.write(json.dumps(record.to_dict()) + "\n")
+        except ValueError as error:
+            parser.error(str(error))
+        finally:
+            if args.jsonl:
+                output_file.close()
+    else:
+        input_file = open(args.jsonl) if args.jsonl else sys.stdin
+        with RecordWriter(args.log) as writer:
+            for line in input_file:
+                if line.strip():
+                    writer.append(GameRecord(**json.loads(line)))
+        if args.jsonl:
+            input_file.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,449 @@
+import random
+import time
+from engine import PLAYER_SYMBOLS, board_lines
+from solver import EXACT, LOWER_BOUND, UPPER_BOUND
+
+# Score of a win, wins found earlier in the search score a little higher
+WIN_SCORE = 1_000_000
+
+# Scores above this are wins or losses rather than evaluations
+WIN_THRESHOLD = WIN_SCORE - 10_000
+
+# Time the search gets for a single move, in seconds
+DEFAULT_TIME_LIMIT = 0.05
+
+# Number of slots in the transposition table
+TABLE_SIZE = 1 << 16
+
+# How far from existing marks a move is still considered on big boards
+MOVE_RADIUS = 2
+
+# Empty cells in the search's own board representation
+NO_SIDE = -1
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when the deadline for a move has passed.
+    """
+
+
+class SearchEngine:
+    """
+    Iterative-deepening alpha-beta search that returns the best move found
+    before a deadline, for boards too big to solve.
+
+    Attributes
+    ----------
+    size (int): The number of rows and columns of the board.
+    win_length (int): The number of marks in a row needed to win.
+    table_size (int): The number of slots in the transposition table.
+    nodes (int): The number of positions searched for the last move.
+    depth (int): The deepest search that finished for the last move.
+    value (int): The value of the last position for the side to move, from
+                 the deepest search that finished.
+    table_hits (int): The number of transposition table entries found for
+                      the last move.
+
+    Methods
+    ----------
+    best_move(): Searches for the best move until the time limit runs out.
+    """
+
+    def __init__(self, size, win_length, table_size=TABLE_SIZE, seed=None):
+        """
+        Initializes a new instance of the SearchEngine class.
+
+        Parameters
+        ----------
+        size (int): The number of rows and columns of the board.
+        win_length (int): The number of marks in a row needed to win.
+        table_size (int): The number of slots in the transposition table,
+                          must be a power of 2.
+        seed (int): Seed for the Zobrist keys.
+        """
+        self.size = size
+        self.win_length = win_length
+        self.table_size = table_size
+        self.nodes = 0
+        self.depth = 0
+        self.value = 0
+        self.table_hits = 0
+        self._lines, self._cell_lines = board_lines(size, win_length)
+        cell_count = size * size
+
+        rng = random.Random(seed)
+        self._zobrist = [
+            [rng.getrandbits(64) for _ in range(cell_count)] for _ in PLAYER_SYMBOLS
+        ]
+        self._side_key = rng.getrandbits(64)
+        # Each slot holds (key, depth, value, flag, move, generation)
+        self._table = [None] * table_size
+        self._generation = 0
+        self._history = [[0] * cell_count for _ in PLAYER_SYMBOLS]
+
+        # A line with count marks of a single side is worth weights[count]
+        self._weights = [0] + [4**count for count in range(1, win_length)] + [0]
+        self._neighbours = tuple(
+            tuple(
+                row * size + column
+                for row in range(
+                    max(0, index // size - MOVE_RADIUS),
+                    min(size, index // size + MOVE_RADIUS + 1),
+                )
+                for column in range(
+                    max(0, index % size - MOVE_RADIUS),
+                    min(size, index % size + MOVE_RADIUS + 1),
+                )
+                if row * size + column != index
+            )
+            for index in range(cell_count)
+        )
+
+    def best_move(self, game_board, symbol, time_limit=DEFAULT_TIME_LIMIT):
+        """
+        Searches for the best move until the time limit runs out.
+
+        Parameters
+        ----------
+        game_board (GameBoard): The current state of the game board.
+        symbol (str): The symbol of the player to move.
+        time_limit (float): The time the search may take, in seconds.
+
+        Returns
+        -------
+        index (int): The best move of the deepest search that finished.
+        """
+        self._deadline = time.perf_counter() + time_limit
+        self._load(game_board)
+        self._generation += 1
+        self.nodes = 0
+        self.depth = 0
+        self.value = 0
+        self.table_hits = 0
+        # Age the history so old positions matter less than recent ones
+        for side_history in self._history:
+            for index, value in enumerate(side_history):
+                side_history[index] = value >> 1
+
+        side = PLAYER_SYMBOLS.index(symbol)
+        moves = self._candidate_moves()
+        best_move = moves[0]
+        for depth in range(1, len(self._empty) + 1):
+            self._killers = [[None, None] for _ in range(depth + 1)]
+            try:
+                value, move = self._search_root(moves, depth, side)
+            except SearchTimeout:
+                break
+            best_move = move
+            self.depth = depth
+            self.value = value
+            # Try the best move first in the next iteration
+            moves.remove(move)
+            moves.insert(0, move)
+            if abs(value) >= WIN_THRESHOLD:
+                break
+        return best_move
+
+    def _load(self, game_board):
+        """
+        Copies a game board into the search's own board representation.
+
+        Parameters
+        ----------
+        game_board (GameBoard): The current state of the game board.
+
+        Returns
+        -------
+        None
+        """
+        self._cells = [
+            PLAYER_SYMBOLS.index(cell) if cell in PLAYER_SYMBOLS else NO_SIDE
+            for cell in game_board.cells
+        ]
+        self._empty = set(game_board.free_cells())
+        # Marked cells in the order they were played, moves are undone last
+        # in first out
+        self._marked = list(game_board.moves)
+        self._counts = [
+            list(game_board.line_counts[symbol]) for symbol in PLAYER_SYMBOLS
+        ]
+        self._hash = 0
+        for index, side in enumerate(self._cells):
+            if side != NO_SIDE:
+                self._hash ^= self._zobrist[side][index]
+        # The evaluation from the point of view of "X"
+        self._score = 0
+        for line_number in range(len(self._lines)):
+            x_count = self._counts[0][line_number]
+            o_count = self._counts[1][line_number]
+            if o_count == 0:
+                self._score += self._weights[x_count]
+            elif x_count == 0:
+                self._score -= self._weights[o_count]
+        self._undo_scores = []
+
+    def _make(self, index, side):
+        """
+        Plays a move on the search's board, updating the line counts, hash
+        and evaluation through the lines of the cell only.
+
+        Parameters
+        ----------
+        index (int): The cell to play.
+        side (int): 0 for "X", 1 for "O".
+
+        Returns
+        -------
+        bool: True if the move won the game.
+        """
+        self._cells[index] = side
+        self._empty.discard(index)
+        self._marked.append(index)
+        self._hash ^= self._zobrist[side][index]
+        own_counts = self._counts[side]
+        other_counts = self._counts[1 - side]
+        weights = self._weights
+        delta = 0
+        won = False
+        for line_number in self._cell_lines[index]:
+            own = own_counts[line_number]
+            other = other_counts[line_number]
+            if other == 0:
+                delta += weights[own + 1] - weights[own]
+            elif own == 0:
+                # The opponent can't complete this line anymore
+                delta += weights[other]
+            own_counts[line_number] = own + 1
+            if own + 1 == self.win_length:
+                won = True
+        if side == 1:
+            delta = -delta
+        self._score += delta
+        self._undo_scores.append(delta)
+        return won
+
+    def _undo(self, index, side):
+        """
+        Takes back a move made with _make().
+
+        Parameters
+        ----------
+        index (int): The cell that was played.
+        side (int): 0 for "X", 1 for "O".
+
+        Returns
+        -------
+        None
+        """
+        self._cells[index] = NO_SIDE
+        self._empty.add(index)
+        self._marked.pop()
+        self._hash ^= self._zobrist[side][index]
+        own_counts = self._counts[side]
+        for line_number in self._cell_lines[index]:
+            own_counts[line_number] -= 1
+        self._score -= self._undo_scores.pop()
+
+    def _candidate_moves(self):
+        """
+        Returns the empty cells worth searching, the ones near existing marks.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        moves (list): The candidate cells.
+        """
+        if not self._marked:
+            return [len(self._cells) // 2]
+        cells = self._cells
+        moves = {
+            neighbour
+            for index in self._marked
+            for neighbour in self._neighbours[index]
+            if cells[neighbour] == NO_SIDE
+        }
+        return list(moves) if moves else list(self._empty)
+
+    def _ordered_moves(self, side, ply, table_move):
+        """
+        Orders the candidate moves so the likely best ones are searched first:
+        the transposition table move, then killer moves, then by history.
+
+        Parameters
+        ----------
+        side (int): 0 for "X", 1 for "O".
+        ply (int): The distance from the root of the search.
+        table_move (int): The best move stored in the transposition table.
+
+        Returns
+        -------
+        moves (list): The candidate cells in search order.
+        """
+        history = self._history[side]
+        moves = sorted(self._candidate_moves(), key=history.__getitem__, reverse=True)
+        for move in reversed((table_move, *self._killers[ply])):
+            if move is not None and move in moves:
+                moves.remove(move)
+                moves.insert(0, move)
+        return moves
+
+    def _search_root(self, moves, depth, side):
+        """
+        Searches all root moves to a fixed depth.
+
+        Parameters
+        ----------
+        moves (list): The root moves in search order.
+        depth (int): The depth to search to.
+        side (int): 0 for "X", 1 for "O".
+
+        Returns
+        -------
+        value (int): The value of the best move.
+        move (int): The best move.
+        """
+        alpha = -WIN_SCORE - 1
+        best_move = moves[0]
+        for move in moves:
+            if self._make(move, side):
+                value = WIN_SCORE
+            else:
+                value = -self._negamax(depth - 1, -WIN_SCORE - 1, -alpha, 1 - side, 1)
+            self._undo(move, side)
+            if value > alpha:
+                alpha = value
+                best_move = move
+        return alpha, best_move
+
+    def _negamax(self, depth, alpha, beta, side, ply):
+        """
+        Scores a position for the side to move with alpha-beta pruning.
+
+        Parameters
+        ----------
+        depth (int): The remaining search depth.
+        alpha (int): The lower bound of the search window.
+        beta (int): The upper bound of the search window.
+        side (int): 0 for "X", 1 for "O".
+        ply (int): The distance from the root of the search.
+
+        Returns
+        -------
+        value (int): The value of the position for the side to move.
+
+        Raises
+        ------
+        SearchTimeout: If the deadline has passed.
+        """
+        self.nodes += 1
+        if self.nodes & 255 == 0 and time.perf_counter() > self._deadline:
+            raise SearchTimeout
+        if not self._empty:
+            return 0
+        if depth == 0:
+            return self._score if side == 0 else -self._score
+
+        key = self._hash ^ self._side_key if side else self._hash
+        slot = key & (self.table_size - 1)
+        entry = self._table[slot]
+        table_move = None
+        if entry is not None and entry[0] == key:
+            self.table_hits += 1
+            _, entry_depth, value, flag, table_move, _ = entry
+            if entry_depth >= depth:
+                value = _from_table(value, ply)
+                if flag == EXACT:
+                    return value
+                if flag == LOWER_BOUND and value >= beta:
+                    return value
+                if flag == UPPER_BOUND and value <= alpha:
+                    return value
+
+        original_alpha = alpha
+        best_value = -WIN_SCORE - 1
+        best_move = None
+        for move in self._ordered_moves(side, ply, table_move):
+            if self._make(move, side):
+                value = WIN_SCORE - ply
+            else:
+                value = -self._negamax(depth - 1, -beta, -alpha, 1 - side, ply + 1)
+            self._undo(move, side)
+            if value > best_value:
+                best_value = value
+                best_move = move
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                killers = self._killers[ply]
+                if killers[0] != move:
+                    killers[1] = killers[0]
+                    killers[0] = move
+                self._history[side][move] += depth * depth
+                break
+
+        if best_value <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_value >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        # Keep the deeper result unless the stored one is from an older move
+        if (
+            entry is None
+            or entry[0] == key
+            or entry[5] != self._generation
+            or entry[1] <= depth
+        ):
+            self._table[slot] = (
+                key,
+                depth,
+                _to_table(best_value, ply),
+                flag,
+                best_move,
+                self._generation,
+            )
+        return best_value
+
+
+def _to_table(value, ply):
+    """
+    Makes a win score relative to the position it is stored for.
+
+    Parameters
+    ----------
+    value (int): The value relative to the root of the search.
+    ply (int): The distance from the root of the search.
+
+    Returns
+    -------
+    int: The value to store in the transposition table.
+    """
+    if value >= WIN_THRESHOLD:
+        return value + ply
+    if value <= -WIN_THRESHOLD:
+        return value - ply
+    return value
+
+
+def _from_table(value, ply):
+    """
+    Makes a stored win score relative to the root of the search again.
+
+    Parameters
+    ----------
+    value (int): The value from the transposition table.
+    ply (int): The distance from the root of the search.
+
+    Returns
+    -------
+    int: The value relative to the root of the search.
+    """
+    if value >= WIN_THRESHOLD:
+        return value - ply
+    if value <= -WIN_THRESHOLD:
+        return value + ply
+    return value
@@ -0,0 +1,439 @@
+"""
+Headless game server speaking line-delimited JSON over TCP or a Unix socket.
+
+Every request is one JSON object on its own line and gets one JSON object
+back. A connection can host any number of game sessions:
+
+    {"type": "new", "difficulty": "hard", "size": 3, "win_length": 3,
+     "ai_starts": false}
+    {"type": "move", "session": 1, "cell": 4}
+    {"type": "close", "session": 1}
+
+"new" and "move" answer with the state of the session, the client always
+plays "X" and the AI "O".
+"""
+
+import asyncio
+import json
+import itertools
+import random
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from ai import AI_SYMBOL, PLAYER_SYMBOL, ComputerPlayer
+from engine import GameBoard
+from strategies import SEARCHING, get_strategy, strategy_names
+
+# The biggest board a client can ask for
+MAX_BOARD_SIZE = 19
+
+REQUEST_TYPES = ("new", "move", "close")
+
+# The games a worker process keeps a computer player for
+MAX_WORKER_PLAYERS = 64
+
+# Computer players of the worker processes, kept between the moves of a game
+# and dropped once they are the least recently used
+_worker_players = OrderedDict()
+
+
+class GameSession:
+    """
+    A single game between a client and a computer player.
+
+    Attributes
+    ----------
+    session_id (int): Identifies the session on its connection.
+    game_board (GameBoard): The state of the game.
+    computer_player (ComputerPlayer): The AI opponent.
+    game_id (int): Identifies the game over all connections of the server.
+
+    Methods
+    ----------
+    state(): Returns the state of the session as a response message.
+    """
+
+    def __init__(self, session_id, game_board, computer_player, game_id=0):
+        """
+        Initializes a new instance of the GameSession class.
+
+        Parameters
+        ----------
+        session_id (int): Identifies the session on its connection.
+        game_board (GameBoard): The state of the game.
+        computer_player (ComputerPlayer): The AI opponent.
+        game_id (int): Identifies the game over all connections of the server.
+        """
+        self.session_id = session_id
+        self.game_board = game_board
+        self.computer_player = computer_player
+        self.game_id = game_id
+
+    def state(self):
+        """
+        Returns the state of the session as a response message.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        dict: The response message.
+        """
+        return {
+            "type": "state",
+            "session": self.session_id,
+            "board": "".join(cell or "." for cell in self.game_board.cells),
+            "moves": self.game_board.moves,
+            "winner": self.game_board.winner(),
+            "over": self.game_board.is_over(),
+        }
+
+
+def _searched_move(game_id, difficulty, size, game_board):
+    """
+    Picks a move for a searching computer player in a worker process. The
+    player is kept per game, its search tree belongs to that game alone, so
+    the next move of the game can reuse it if it runs in the same worker.
+
+    Parameters
+    ----------
+    game_id (int): Identifies the game over all connections of the server.
+    difficulty (str): The difficulty of the computer player.
+    size (int): The number of rows and columns of the game board.
+    game_board (GameBoard): A snapshot of the game board.
+
+    Returns
+    -------
+    index (int): The index of the cell to play.
+    """
+    computer_player = _worker_players.get(game_id)
+    if computer_player is None:
+        computer_player = ComputerPlayer(difficulty, AI_SYMBOL, size=size)
+        _worker_players[game_id] = computer_player
+        if len(_worker_players) > MAX_WORKER_PLAYERS:
+            _worker_players.popitem(last=False)
+    else:
+        _worker_players.move_to_end(game_id)
+    return computer_player.handle_turn(game_board)
+
+
+class GameServer:
+    """
+    Serves game sessions to many clients at once.
+
+    Attributes
+    ----------
+    executor (ProcessPoolExecutor): The pool running searching computer players.
+    session_count (int): The number of open sessions over all connections.
+
+    Methods
+    ----------
+    handle_connection(): Serves the requests of a single connection.
+
+    handle_request(): Answers a single request.
+    """
+
+    def __init__(self, executor=None):
+        """
+        Initializes a new instance of the GameServer class.
+
+        Parameters
+        ----------
+        executor (ProcessPoolExecutor): The pool running searching computer
+                                        players, a new one by default.
+        """
+        self.executor = executor or ProcessPoolExecutor()
+        self.session_count = 0
+        self._game_ids = itertools.count(1)
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serves the requests of a single connection until it closes.
+
+        Parameters
+        ----------
+        reader (asyncio.StreamReader): The incoming side of the connection.
+        writer (asyncio.StreamWriter): The outgoing side of the connection.
+
+        Returns
+        -------
+        None
+        """
+        sessions = {}
+        try:
+            while line := await reader.readline():
+                try:
+                    response = await self.handle_request(json.loads(line), sessions)
+                except (ValueError, TypeError, AttributeError) as error:
+                    response = {"type": "error", "message": str(error)}
+                except KeyError as error:
+                    response = {"type": "error", "message": error.args[0]}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.session_count -= len(sessions)
+            writer.close()
+
+    async def handle_request(self, request, sessions):
+        """
+        Answers a single request.
+
+        Parameters
+        ----------
+        request (dict): The decoded request.
+        sessions (dict): The sessions of the connection, by id.
+
+        Returns
+        -------
+        dict: The response message.
+
+        Raises
+        ------
+        ValueError: If the request is invalid.
+        KeyError: If the request names an unknown session.
+        """
+        request_type = request.get("type")
+        if request_type not in REQUEST_TYPES:
+            raise ValueError(f"Unknown request type {request_type!r}")
+        if request_type == "new":
+            difficulty = request.get("difficulty", "hard")
+            if difficulty not in strategy_names():
+                raise ValueError(f"Unknown difficulty {difficulty!r}")
+            size = request.get("size", 3)
+            if not 3 <= size <= MAX_BOARD_SIZE:
+                raise ValueError(f"The board size must be 3 to {MAX_BOARD_SIZE}")
+            game_board = GameBoard(size, request.get("win_length", 3))
+            session_id = max(sessions, default=0) + 1
+            session = GameSession(
+                session_id,
+                game_board,
+                ComputerPlayer(difficulty, size=size),
+                next(self._game_ids),
+            )
+            sessions[session_id] = session
+            self.session_count += 1
+            if request.get("ai_starts", False):
+                game_board.reset(AI_SYMBOL)
+                await self.play_computer_turn(session)
+            return session.state()
+
+        session_id = request.get("session")
+        if session_id not in sessions:
+            raise KeyError(f"Unknown session {session_id!r}")
+        session = sessions[session_id]
+        if request_type == "move":
+            cell = request.get("cell")
+            game_board = session.game_board
+            if game_board.is_over():
+                raise ValueError("The game is over")
+            # JSON true and false arrive as bools, which are ints too
+            if (
+                not isinstance(cell, int)
+                or isinstance(cell, bool)
+                or not 0 <= cell < len(game_board.cells)
+            ):
+                raise ValueError(f"Cell {cell!r} doesn't exist")
+            if not game_board.is_free(cell):
+                raise ValueError(f"Cell {cell} is already taken")
+            game_board.place(cell, PLAYER_SYMBOL)
+            await self.play_computer_turn(session)
+            return session.state()
+        del sessions[session_id]
+        self.session_count -= 1
+        return {"type": "closed", "session": session_id}
+
+    async def play_computer_turn(self, session):
+        """
+        Lets the computer player of a session take its turn. Searching
+        players run in the process pool so other sessions aren't blocked.
+
+        Parameters
+        ----------
+        session (GameSession): The session.
+
+        Returns
+        -------
+        None
+        """
+        game_board = session.game_board
+        computer_player = session.computer_player
+        if game_board.is_over():
+            return
+        # Searching strategies are too slow to run on the event loop
+        if get_strategy(computer_player.difficulty).cost == SEARCHING:
+            move = await asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                _searched_move,
+                session.game_id,
+                computer_player.difficulty,
+                computer_player.size,
+                game_board,
+            )
+        else:
+            move = computer_player.handle_turn(game_board)
+        game_board.place(move, AI_SYMBOL)
+
+
+async def serve(host="127.0.0.1", port=8765, unix_path=None, workers=None):
+    """
+    Runs the game server until it gets cancelled.
+
+    Parameters
+    ----------
+    host (str): The address to listen on.
+    port (int): The TCP port to listen on.
+    unix_path (str): Listen on this Unix socket instead of TCP.
+    workers (int): The number of processes for searching computer players.
+
+    Returns
+    -------
+    None
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        game_server = GameServer(executor)
+        if unix_path:
+            server = await asyncio.start_unix_server(
+                game_server.handle_connection, path=unix_path
+            )
+        else:
+            server = await asyncio.start_server(
+                game_server.handle_connection, host, port
+            )
+        async with server:
+            await server.serve_forever()
+
+
+async def _play_client(host, port, unix_path, games, difficulty, rng):
+    """
+    Plays games against the server with random moves over one connection.
+
+    Parameters
+    ----------
+    host (str): The address of the server.
+    port (int): The TCP port of the server.
+    unix_path (str): The Unix socket of the server instead of TCP.
+    games (int): The number of games to play.
+    difficulty (str): The difficulty of the computer player.
+    rng (random.Random): Picks the client's moves.
+
+    Returns
+    -------
+    results (dict): The number of games per winner, "draw" for draws.
+    """
+    if unix_path:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+
+    async def request(message):
+        writer.write(json.dumps(message).encode() + b"\n")
+        await writer.drain()
+        return json.loads(await reader.readline())
+
+    results = {}
+    for _ in range(games):
+        state = await request(
+            {"type": "new", "difficulty": difficulty, "ai_starts": rng.random() < 0.5}
+        )
+        while not state["over"]:
+            free_cells = [i for i, cell in enumerate(state["board"]) if cell == "."]
+            state = await request(
+                {
+                    "type": "move",
+                    "session": state["session"],
+                    "cell": rng.choice(free_cells),
+                }
+            )
+        winner = state["winner"] or "draw"
+        results[winner] = results.get(winner, 0) + 1
+        await request({"type": "close", "session": state["session"]})
+    writer.close()
+    return results
+
+
+async def load_test(
+    host="127.0.0.1",
+    port=8765,
+    unix_path=None,
+    clients=100,
+    games=10,
+    difficulty="hard",
+):
+    """
+    Plays many games at once against a running server.
+
+    Parameters
+    ----------
+    host (str): The address of the server.
+    port (int): The TCP port of the server.
+    unix_path (str): The Unix socket of the server instead of TCP.
+    clients (int): The number of concurrent connections.
+    games (int): The number of games every connection plays.
+    difficulty (str): The difficulty of the computer player.
+
+    Returns
+    -------
+    results (dict): The number of games per winner, "draw" for draws.
+    """
+    client_results = await asyncio.gather(
+        *(
+            _play_client(host, port, unix_path, games, difficulty, random.Random(i))
+            for i in range(clients)
+        )
+    )
+    results = {}
+    for client_result in client_results:
+        for winner, count in client_result.items():
+            results[winner] = results.get(winner, 0) + count
+    return results
+
+
+def main():
+    """
+    Runs the server or the load test client from the command line.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve Tic Tac Toe games.")
+    parser.add_argument("command", choices=("serve", "load-test"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="use this Unix socket instead of TCP")
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--difficulty", choices=strategy_names(), default="hard")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.host, args.port, args.unix, args.workers))
+        except KeyboardInterrupt:
+            pass
+    else:
+        results = asyncio.run(
+            load_test(
+                args.host,
+                args.port,
+                args.unix,
+                args.clients,
+                args.games,
+                args.difficulty,
+            )
+        )
+        print(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+import importlib
+import os
+import random
+from ai import ComputerPlayer
+from engine import GameBoard
+from records import RecordWriter, record_from_board
+from strategies import strategy_names
+
+
+class CustomPlayer:
+    """
+    Adapts a plain function to the interface of ComputerPlayer, so it can
+    play in simulated games.
+
+    Attributes
+    ----------
+    choose_move (callable): Function taking (game_board, symbol, rng) and
+                            returning the index of the square to play.
+    symbol (str): The symbol the player plays with.
+    rng (random.Random): The random number generator handed to the function.
+
+    Methods
+    ----------
+    handle_turn(): Picks the square to play.
+    """
+
+    def __init__(self, choose_move, symbol, rng=None):
+        """
+        Initializes a new instance of the CustomPlayer class.
+
+        Parameters
+        ----------
+        choose_move (callable): Function taking (game_board, symbol, rng) and
+                                returning the index of the square to play.
+        symbol (str): The symbol the player plays with.
+        rng (random.Random): A seeded random number generator to make games
+                             reproducible, a fresh one by default.
+        """
+        self.choose_move = choose_move
+        self.symbol = symbol
+        self.rng = rng or random.Random()
+
+    def handle_turn(self, game_board):
+        """
+        Picks the square to play.
+
+        Parameters
+        ----------
+        game_board (GameBoard): The current state of the game board.
+
+        Returns
+        -------
+        button_index (int): The index of the selected square.
+        """
+        return self.choose_move(game_board, self.symbol, self.rng)
+
+
+def create_player(strategy, symbol, rng=None, size=3):
+    """
+    Creates a player for a strategy.
+
+    Parameters
+    ----------
+    strategy (str): Either the name of a registered strategy or
+                    "module:function" pointing to a custom move function.
+    symbol (str): The symbol the player plays with.
+    rng (random.Random): The random number generator of the player.
+    size (int): The number of rows and columns of the game board.
+
+    Returns
+    -------
+    player (ComputerPlayer or CustomPlayer): The player.
+
+    Raises
+    ------
+    ValueError: If the strategy is unknown or its module or function can't
+                be found.
+    """
+    if strategy in strategy_names():
+        return ComputerPlayer(strategy, symbol, rng, size)
+    module_name, _, function_name = strategy.partition(":")
+    if not function_name:
+        raise ValueError(f"Unknown strategy {strategy!r}")
+    try:
+        choose_move = getattr(importlib.import_module(module_name), function_name)
+    except (ImportError, AttributeError) as error:
+        raise ValueError(f"Can't load strategy {strategy!r}: {error}") from error
+    return CustomPlayer(choose_move, symbol, rng)
+
+
+def play_game(player_x, player_o, x_starts, size=3, win_length=3, game_board=None):
+    """
+    Plays a single game between two players without a GUI.
+
+    Parameters
+    ----------
+    player_x: The player using "X".
+    player_o: The player using "O".
+    x_starts (bool): True if the "X" player takes the first turn.
+    size (int): The number of rows and columns of the game board.
+    win_length (int): The number of marks in a row needed to win.
+    game_board (GameBoard): A board to play on, to look at the moves
+                            afterwards. It gets cleared first. A new one by
+                            default.
+
+    Returns
+    -------
+    winner (str): The winning symbol, None for a draw.
+    """
+    if game_board is None:
+        game_board = GameBoard(size, win_length)
+    players = [player_x, player_o] if x_starts else [player_o, player_x]
+    game_board.reset(players[0].symbol)
+    turn = 0
+    while not game_board.is_over():
+        player = players[turn % 2]
+        game_board.place(player.handle_turn(game_board), player.symbol)
+        turn += 1
+    return game_board.winner()
+
+
+def _play_chunk(task):
+    """
+    Plays a chunk of games in a worker process.
+
+    Parameters
+    ----------
+    task (tuple): (strategy_one, strategy_two, first_game, games, seed, size,
+                  win_length, record)
+
+    Returns
+    -------
+    results (dict): The wins, draws and losses of strategy one.
+    records (bytes): The packed records of the games if record is set.
+    """
+    (
+        strategy_one,
+        strategy_two,
+        first_game,
+        games,
+        seed,
+        size,
+        win_length,
+        record,
+    ) = task
+    # Seed each chunk on its own so results don't depend on the scheduling
+    rng = random.Random(f"{seed}-{first_game}")
+    results = {"wins": 0, "draws": 0, "losses": 0}
+    records = bytearray()
+    game_board = GameBoard(size, win_length)
+    for game_number in range(first_game, first_game + games):
+        winner = play_game(
+            create_player(strategy_one, "X", rng, size),
+            create_player(strategy_two, "O", rng, size),
+            # Alternate which strategy starts
+            x_starts=game_number % 2 == 0,
+            game_board=game_board,
+        )
+        if record:
+            records += record_from_board(
+                game_board, strategy_one, strategy_two
+            ).to_bytes()
+        if winner == "X":
+            results["wins"] += 1
+        elif winner == "O":
+            results["losses"] += 1
+        else:
+            results["draws"] += 1
+    return results, bytes(records)
+
+
+def simulate(
+    strategy_one,
+    strategy_two,
+    games,
+    workers=None,
+    chunk_size=1000,
+    seed=0,
+    size=3,
+    win_length=3,
+    record_path=None,
+):
+    """
+    Plays a number of games between two strategies spread over a pool of
+    worker processes. The strategies take turns starting.
+
+    Parameters
+    ----------
+    strategy_one (str): The strategy the results are reported for.
+    strategy_two (str): The opposing strategy.
+    games (int): The number of games to play.
+    workers (int): The number of worker processes, all cores by default.
+    chunk_size (int): The number of games a worker plays per task.
+    seed (int): The seed that makes a run reproducible.
+    size (int): The number of rows and columns of the game board.
+    win_length (int): The number of marks in a row needed to win.
+    record_path (str): Append the records of all games to this game log.
+
+    Returns
+    -------
+    results (dict): The wins, draws and losses of strategy one.
+    """
+    # Fail early on unknown strategies or board shapes instead of in every worker
+    create_player(strategy_one, "X", size=size)
+    create_player(strategy_two, "O", size=size)
+    GameBoard(size, win_length)
+
+    tasks = [
+        (
+            strategy_one,
+            strategy_two,
+            first_game,
+            min(chunk_size, games - first_game),
+            seed,
+            size,
+            win_length,
+            record_path is not None,
+        )
+        for first_game in range(0, games, chunk_size)
+    ]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        executor = None
+        chunk_results = map(_play_chunk, tasks)
+    else:
+        # Imported here, worker processes and single process runs don't need it
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(max_workers=workers)
+        chunk_results = executor.map(_play_chunk, tasks)
+
+    record_writer = RecordWriter(record_path) if record_path else None
+    results = {"wins": 0, "draws": 0, "losses": 0}
+    try:
+        # Chunks arrive in order, so their records can be written right away
+        for task, (chunk_result, records) in zip(tasks, chunk_results):
+            for outcome, count in chunk_result.items():
+                results[outcome] += count
+            if record_writer is not None:
+                record_writer.append_bytes(records, task[3])
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if record_writer is not None:
+            record_writer.close()
+    return results
+
+
+def main():
+    """
+    Runs a simulation from the command line and prints the results.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Play Tic Tac Toe games between two AI strategies."
+    )
+    strategy_help = f"{', '.join(strategy_names())} or module:function"
+    parser.add_argument("strategy_one", help=strategy_help)
+    parser.add_argument("strategy_two", help=strategy_help)
+    parser.add_argument("-n", "--games", type=int, default=10000)
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--size", type=int, default=3)
+    parser.add_argument("--win-length", type=int, default=3)
+    parser.add_argument("--record", help="append every game to this game log")
+    args = parser.parse_args()
+
+    try:
+        results = simulate(
+            args.strategy_one,
+            args.strategy_two,
+            args.games,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            seed=args.seed,
+            size=args.size,
+            win_length=args.win_length,
+            record_path=args.record,
+        )
+    except ValueError as error:
+        parser.error(str(error))
+    print(
+        f"{args.strategy_one} vs {args.strategy_two}: "
+        f"{results['wins']} wins, {results['draws']} draws, "
+        f"{results['losses']} losses"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import random
+from engine import CELL_LINE_MASKS, FULL_MASK
+from symmetry import MASK_TABLES, canonicalize, canonical_key, from_canonical
+
+# Flags telling how a transposition table value relates to the exact value
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# Exact value and best moves of every reachable position up to symmetry,
+# set once the first solve() is complete, so other threads never see a
+# partial table. Moves are stored in the frame of the canonical board.
+_solved_positions = None
+
+
+def negamax(own_mask, other_mask, last_move, alpha, beta, table):
+    """
+    Scores a position for the player to move with alpha-beta pruning.
+
+    A win is worth more the earlier it happens, so the solver prefers quick
+    wins and slow losses.
+
+    Parameters
+    ----------
+    own_mask (int): The marks of the player to move.
+    other_mask (int): The marks of the opponent.
+    last_move (int): The cell the opponent just played, None on an empty board.
+    alpha (int): The lower bound of the search window.
+    beta (int): The upper bound of the search window.
+    table (dict): Transposition table mapping canonical keys to (value, flag).
+
+    Returns
+    -------
+    value (int): Positive if the player to move wins, 0 for a draw.
+    """
+    taken_mask = own_mask | other_mask
+    empty_count = 9 - taken_mask.bit_count()
+    # The opponent's last move can only have completed a line through it
+    if last_move is not None and _is_won(other_mask, last_move):
+        return -(empty_count + 1)
+    if taken_mask == FULL_MASK:
+        return 0
+
+    key = canonical_key(own_mask, other_mask)
+    entry = table.get(key)
+    original_alpha = alpha
+    if entry is not None:
+        value, flag = entry
+        if flag == EXACT:
+            return value
+        if flag == LOWER_BOUND:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if alpha >= beta:
+            return value
+
+    best_value = -10
+    for index in range(9):
+        if taken_mask >> index & 1:
+            continue
+        value = -negamax(other_mask, own_mask | 1 << index, index, -beta, -alpha, table)
+        if value > best_value:
+            best_value = value
+        if value > alpha:
+            alpha = value
+        if alpha >= beta:
+            break
+
+    if best_value <= original_alpha:
+        table[key] = (best_value, UPPER_BOUND)
+    elif best_value >= beta:
+        table[key] = (best_value, LOWER_BOUND)
+    else:
+        table[key] = (best_value, EXACT)
+    return best_value
+
+
+def solve():
+    """
+    Solves every position reachable from the empty board, no matter which
+    symbol starts, and stores its exact value and best moves. Symmetric
+    positions share one entry.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    dict: Mapping of canonical keys to (value, best_moves).
+    """
+    global _solved_positions
+    if _solved_positions is not None:
+        return _solved_positions
+    solved_positions = {}
+    table = {}
+    pending = [(0, 0)]
+    seen = {canonical_key(0, 0)}
+    while pending:
+        own_mask, other_mask = pending.pop()
+        taken_mask = own_mask | other_mask
+        scores = {}
+        for index in range(9):
+            if taken_mask >> index & 1:
+                continue
+            child_own, child_other = other_mask, own_mask | 1 << index
+            scores[index] = -negamax(child_own, child_other, index, -10, 10, table)
+            # Only keep walking through positions where the game goes on
+            child_key, transform = canonicalize(child_own, child_other)
+            if (
+                child_key not in seen
+                and child_own | child_other != FULL_MASK
+                and not _is_won(child_other, index)
+            ):
+                seen.add(child_key)
+                mask_table = MASK_TABLES[transform]
+                pending.append((mask_table[child_own], mask_table[child_other]))
+        best_value = max(scores.values())
+        best_moves = tuple(
+            index for index, value in scores.items() if value == best_value
+        )
+        solved_positions[canonical_key(own_mask, other_mask)] = (
+            best_value,
+            best_moves,
+        )
+    _solved_positions = solved_positions
+    return solved_positions
+
+
+def _is_won(mask, last_move):
+    """
+    Checks if the last move completed a line.
+
+    Parameters
+    ----------
+    mask (int): The marks of the player who made the last move.
+    last_move (int): The cell that was just played.
+
+    Returns
+    -------
+    bool: True if a line through the last move is complete.
+    """
+    for line_mask in CELL_LINE_MASKS[last_move]:
+        if mask & line_mask == line_mask:
+            return True
+    return False
+
+
+def best_move(own_mask, other_mask, rng=random):
+    """
+    Looks up a perfect move for the player to move.
+
+    Parameters
+    ----------
+    own_mask (int): The marks of the player to move.
+    other_mask (int): The marks of the opponent.
+    rng (random.Random): The random number generator that picks between
+                         equally good moves.
+
+    Returns
+    -------
+    index (int): The index of the cell to play.
+    """
+    key, transform = canonicalize(own_mask, other_mask)
+    _, best_moves = solve()[key]
+    return from_canonical(rng.choice(best_moves), transform)
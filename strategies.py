@@ -0,0 +1,465 @@
+"""
+The strategies the computer players pick their moves with, and the registry
+the menu, the simulator and the server find them in.
+
+A strategy gets the current game board, which it must not change, and
+returns the cell to play. It declares how expensive it is, so callers can
+run searching strategies in a worker pool and cheap ones right away. Other
+packages can add strategies through the "tictactoe.strategies" entry point
+group, pointing at a Strategy subclass:
+
+    [project.entry-points."tictactoe.strategies"]
+    greedy = "my_package.greedy:GreedyStrategy"
+"""
+
+import random
+import warnings
+from analysis import position_key, shared_cache, threat_lines
+from engine import PLAYER_SYMBOLS
+from mcts import MonteCarloTreeSearch
+from search import DEFAULT_TIME_LIMIT, SearchEngine
+
+# Cost profiles: cheap strategies answer at once, searching ones think for
+# their time limit
+CHEAP = "cheap"
+SEARCHING = "searching"
+
+# The entry point group of strategy plugins
+PLUGIN_GROUP = "tictactoe.strategies"
+
+# Strategy classes by name, in the order they were registered
+_strategies = {}
+
+# Set once the plugins of PLUGIN_GROUP were loaded
+_plugins_loaded = False
+
+
+class Strategy:
+    """
+    The interface of a strategy. Subclasses set the class attributes and
+    implement select_move().
+
+    Attributes
+    ----------
+    name (str): The name the strategy is registered and chosen by.
+    label (str): The text of its button in the menu.
+    cost (str): CHEAP or SEARCHING.
+    board_sizes (tuple): The board sizes it can play on, None for all.
+    size (int): The number of rows and columns of the game board.
+    rng (random.Random): The random number generator behind all random choices.
+    time_limit (float): The seconds a searching strategy may think about a move.
+    iterations (int): The simulations a strategy runs per move, None to use
+                      the time limit instead.
+    workers (int): The processes a strategy may search in.
+    analysis_cache (AnalysisCache): The analyses of positions searched before.
+
+    Methods
+    ----------
+    select_move(): Picks the cell to play.
+
+    counters(): Returns the counters of the last move for instrumentation.
+    """
+
+    name = ""
+    label = ""
+    cost = CHEAP
+    board_sizes = None
+
+    def __init__(
+        self,
+        size=3,
+        rng=None,
+        time_limit=DEFAULT_TIME_LIMIT,
+        iterations=None,
+        workers=1,
+        analysis_cache=None,
+    ):
+        """
+        Initializes a new instance of the strategy.
+
+        Parameters
+        ----------
+        size (int): The number of rows and columns of the game board.
+        rng (random.Random): A seeded random number generator to make games
+                             reproducible, a fresh one by default.
+        time_limit (float): The seconds a searching strategy may think about
+                            a move.
+        iterations (int): The simulations a strategy runs per move, None to
+                          use the time limit instead.
+        workers (int): The processes a strategy may search in, 1 to search
+                       in this process, None for one per CPU.
+        analysis_cache (AnalysisCache): The analyses of positions to look
+                                        moves up in, the cache shared by all
+                                        players of the process by default.
+        """
+        self.size = size
+        self.rng = rng or random.Random()
+        self.time_limit = time_limit
+        self.iterations = iterations
+        self.workers = workers
+        if analysis_cache is None:
+            analysis_cache = shared_cache()
+        self.analysis_cache = analysis_cache
+
+    def select_move(self, game_board):
+        """
+        Picks the cell to play for the side to move.
+
+        Parameters
+        ----------
+        game_board (GameBoard): The current state of the game board, which
+                                must not be changed.
+
+        Returns
+        -------
+        index (int): The index of an empty cell.
+        """
+        raise NotImplementedError
+
+    def counters(self):
+        """
+        Returns the counters of the last move for instrumentation.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        dict: Counter names mapped to amounts.
+        """
+        return {}
+
+
+def register_strategy(strategy_class):
+    """
+    Adds a strategy class to the registry under its name. Can be used as a
+    class decorator.
+
+    Parameters
+    ----------
+    strategy_class (type): A subclass of Strategy.
+
+    Returns
+    -------
+    strategy_class (type): The same class.
+
+    Raises
+    ------
+    ValueError: If the class has no name or another strategy has the name.
+    """
+    name = strategy_class.name
+    if not name:
+        raise ValueError(f"{strategy_class.__name__} has no name")
+    if _strategies.get(name, strategy_class) is not strategy_class:
+        raise ValueError(f"A strategy named {name!r} is already registered")
+    _strategies[name] = strategy_class
+    return strategy_class
+
+
+def load_plugins(group=PLUGIN_GROUP):
+    """
+    Registers the strategies of the installed packages in an entry point
+    group. A plugin that fails to load is skipped with a warning.
+
+    Parameters
+    ----------
+    group (str): The entry point group.
+
+    Returns
+    -------
+    None
+    """
+    # Imported here, it is only needed the first time the registry is read
+    from importlib.metadata import entry_points
+
+    for entry_point in entry_points(group=group):
+        try:
+            strategy_class = entry_point.load()
+            if strategy_class.name != entry_point.name:
+                raise ValueError(f"it is named {strategy_class.name!r}")
+            register_strategy(strategy_class)
+        except Exception as error:
+            warnings.warn(f"Skipping strategy plugin {entry_point.name!r}: {error}")
+
+
+def _registry():
+    """
+    Returns the registered strategies, loading the plugins the first time.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    dict: Strategy classes by name.
+    """
+    global _plugins_loaded
+    if not _plugins_loaded:
+        _plugins_loaded = True
+        load_plugins()
+    return _strategies
+
+
+def get_strategy(name):
+    """
+    Looks up a registered strategy class.
+
+    Parameters
+    ----------
+    name (str): The name of the strategy.
+
+    Returns
+    -------
+    type: The Strategy subclass.
+
+    Raises
+    ------
+    ValueError: If no strategy has the name.
+    """
+    strategy_class = _registry().get(name)
+    if strategy_class is None:
+        raise ValueError(f"Unknown strategy {name!r}")
+    return strategy_class
+
+
+def strategy_names(size=None, cost=None):
+    """
+    Returns the names of the registered strategies in the order they were
+    registered.
+
+    Parameters
+    ----------
+    size (int): Only strategies that can play on this board size, all by
+                default.
+    cost (str): Only strategies with this cost profile, all by default.
+
+    Returns
+    -------
+    tuple: The names.
+    """
+    return tuple(
+        name
+        for name, strategy_class in _registry().items()
+        if (size is None or supports_size(strategy_class, size))
+        and (cost is None or strategy_class.cost == cost)
+    )
+
+
+def supports_size(strategy_class, size):
+    """
+    Checks if a strategy can play on a board size.
+
+    Parameters
+    ----------
+    strategy_class (type): A subclass of Strategy.
+    size (int): The number of rows and columns of the game board.
+
+    Returns
+    -------
+    bool: True if the strategy can play on the board.
+    """
+    return strategy_class.board_sizes is None or size in strategy_class.board_sizes
+
+
+def create_strategy(name, size=3, **settings):
+    """
+    Creates a registered strategy for a board size.
+
+    Parameters
+    ----------
+    name (str): The name of the strategy.
+    size (int): The number of rows and columns of the game board.
+    settings: The other arguments of Strategy().
+
+    Returns
+    -------
+    Strategy: The strategy.
+
+    Raises
+    ------
+    ValueError: If the strategy is unknown or can't play on the board size.
+    """
+    strategy_class = get_strategy(name)
+    if not supports_size(strategy_class, size):
+        raise ValueError(f"The {name} AI can't play on a {size}x{size} board")
+    return strategy_class(size, **settings)
+
+
+@register_strategy
+class EasyStrategy(Strategy):
+    """
+    Plays a random empty cell.
+    """
+
+    name = "easy"
+    label = "Easy AI"
+
+    def select_move(self, game_board):
+        return game_board.random_free_cell(self.rng)
+
+
+@register_strategy
+class HardStrategy(Strategy):
+    """
+    Plays scripted moves: a corner or the center on its first turn, then a
+    winning move, a block, or a fork, in that order.
+
+    Attributes
+    ----------
+    corner_numbers (list): List of indices representing corners on the game board.
+    center_numbers (list): The indices of the center of the game board, the
+                           four middle cells on boards of even size.
+    """
+
+    name = "hard"
+    label = "Hard AI"
+
+    def __init__(self, size=3, rng=None, **settings):
+        super().__init__(size, rng, **settings)
+        last = size - 1
+        self.corner_numbers = [0, last, last * size, size * size - 1]
+        middle = (size - 1) // 2
+        self.center_numbers = [
+            row * size + column
+            for row in range(middle, size - middle)
+            for column in range(middle, size - middle)
+        ]
+
+    def select_move(self, game_board):
+        # The number of moves played tells if this is the AI's first turn
+        # and who started
+        state = game_board.state
+        if state.ply == 0:
+            return game_board.random_free_cell(self.rng)
+        # The playing strategy for the hard AI in their first turn
+        if state.ply == 1:
+            if game_board.moves[0] in self.corner_numbers:
+                return self.rng.choice(self.center_numbers)
+            return self.rng.choice(self.corner_numbers)
+        # The playing strategy for the hard AI after their first turn. It
+        # takes priority to winning the game otherwise it tries to prevent
+        # the player from winning. Then it sets up or blocks a fork, two
+        # winning moves at once
+        symbol = state.symbol_to_move()
+        opponent_symbol = PLAYER_SYMBOLS[1 - state.side]
+        computer_winning_moves = game_board.winning_moves(symbol)
+        if computer_winning_moves:
+            return computer_winning_moves[0]
+        player_winning_moves = game_board.winning_moves(opponent_symbol)
+        if player_winning_moves:
+            return player_winning_moves[0]
+        forks = game_board.fork_moves(symbol) or game_board.fork_moves(opponent_symbol)
+        if forks:
+            return self.rng.choice(forks)
+        return game_board.random_free_cell(self.rng)
+
+
+@register_strategy
+class PerfectStrategy(Strategy):
+    """
+    Looks its moves up in the opening book of the solved 3x3 game, so it
+    never loses.
+    """
+
+    name = "perfect"
+    label = "Perfect AI"
+    board_sizes = (3,)
+
+    def select_move(self, game_board):
+        # Imported here, loading the book costs startup time it doesn't
+        # need for other strategies
+        import book
+
+        state = game_board.state
+        return book.best_move(
+            state.mask(state.side), state.mask(1 - state.side), self.rng
+        )
+
+
+@register_strategy
+class ExpertStrategy(Strategy):
+    """
+    Searches as many moves ahead as it can within its time limit, unless
+    the position was searched before with the same time limit.
+
+    Attributes
+    ----------
+    search_engine (SearchEngine): The search, created on the first move.
+    analysis_hit (bool): True if the last move was looked up in the
+                         analysis cache instead of searched.
+    """
+
+    name = "expert"
+    label = "Expert AI"
+    cost = SEARCHING
+
+    def __init__(self, size=3, rng=None, **settings):
+        super().__init__(size, rng, **settings)
+        self.search_engine = None
+        self.analysis_hit = False
+
+    def select_move(self, game_board):
+        # A search with less time may have stopped shallower, so only
+        # analyses made with the same time limit are reused
+        key = ("expert", self.time_limit, position_key(game_board))
+        analysis = self.analysis_cache.get(key)
+        self.analysis_hit = analysis is not None
+        if analysis is None:
+            if self.search_engine is None:
+                self.search_engine = SearchEngine(
+                    game_board.size, game_board.win_length
+                )
+            move = self.search_engine.best_move(
+                game_board, game_board.state.symbol_to_move(), self.time_limit
+            )
+            analysis = (move, self.search_engine.value, threat_lines(game_board))
+            self.analysis_cache.put(key, analysis)
+        return analysis[0]
+
+    def counters(self):
+        if self.analysis_hit:
+            return {"analysis_hits": 1}
+        if self.search_engine is None:
+            return {}
+        return {
+            "nodes": self.search_engine.nodes,
+            "table_hits": self.search_engine.table_hits,
+        }
+
+
+@register_strategy
+class MctsStrategy(Strategy):
+    """
+    Simulates random games from the current position and plays the move
+    that won most of them, keeping its tree between moves.
+
+    Attributes
+    ----------
+    tree_search (MonteCarloTreeSearch): The search, kept between moves of a
+                                        game, or a ParallelTreeSearch with
+                                        several workers.
+    """
+
+    name = "mcts"
+    label = "MCTS AI"
+    cost = SEARCHING
+
+    def __init__(self, size=3, rng=None, **settings):
+        super().__init__(size, rng, **settings)
+        self.tree_search = None
+
+    def select_move(self, game_board):
+        # Search independent trees in a process pool and merge them
+        if self.tree_search is None and self.workers != 1:
+            from parallel import ParallelTreeSearch
+
+            self.tree_search = ParallelTreeSearch(self.workers, self.iterations)
+        if self.tree_search is None:
+            self.tree_search = MonteCarloTreeSearch(
+                game_board.size, game_board.win_length, self.iterations, rng=self.rng
+            )
+        return self.tree_search.best_move(
+            game_board, game_board.state.symbol_to_move(), self.time_limit
+        )
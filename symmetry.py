@@ -0,0 +1,143 @@
+def _rotate(index):
+    """
+    Returns where a cell ends up after rotating the board 90 degrees clockwise.
+
+    Parameters
+    ----------
+    index (int): The index of the cell.
+
+    Returns
+    -------
+    int: The index of the cell after the rotation.
+    """
+    row, column = divmod(index, 3)
+    return column * 3 + (2 - row)
+
+
+def _mirror(index):
+    """
+    Returns where a cell ends up after mirroring the board left to right.
+
+    Parameters
+    ----------
+    index (int): The index of the cell.
+
+    Returns
+    -------
+    int: The index of the cell after the reflection.
+    """
+    row, column = divmod(index, 3)
+    return row * 3 + (2 - column)
+
+
+def _build_permutations():
+    """
+    Builds the 8 rotations and reflections of the board as cell permutations.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    tuple: 8 tuples where entry i is the index cell i moves to.
+    """
+    permutations = []
+    for mirrored in (False, True):
+        permutation = [_mirror(i) if mirrored else i for i in range(9)]
+        for _ in range(4):
+            permutations.append(tuple(permutation))
+            permutation = [_rotate(index) for index in permutation]
+    return tuple(permutations)
+
+
+# Entry i of a permutation is the index cell i moves to, the first one is the
+# identity
+PERMUTATIONS = _build_permutations()
+
+# Entry i of an inverse permutation is the original index of transformed cell i
+INVERSE_PERMUTATIONS = tuple(
+    tuple(permutation.index(i) for i in range(9)) for permutation in PERMUTATIONS
+)
+
+# Every 9-bit mask after each transform, so a transform is a single lookup
+MASK_TABLES = tuple(
+    tuple(
+        sum(1 << permutation[i] for i in range(9) if mask >> i & 1)
+        for mask in range(512)
+    )
+    for permutation in PERMUTATIONS
+)
+
+
+def canonicalize(own_mask, other_mask):
+    """
+    Maps a position to its representative among its 8 symmetric versions.
+
+    Parameters
+    ----------
+    own_mask (int): The marks of the player to move.
+    other_mask (int): The marks of the opponent.
+
+    Returns
+    -------
+    key (int): The smallest packed key of all symmetric versions.
+    transform (int): The index of the transform that gives that key.
+    """
+    key = own_mask | other_mask << 9
+    transform = 0
+    for index in range(1, 8):
+        table = MASK_TABLES[index]
+        candidate = table[own_mask] | table[other_mask] << 9
+        if candidate < key:
+            key = candidate
+            transform = index
+    return key, transform
+
+
+def canonical_key(own_mask, other_mask):
+    """
+    Returns the canonical key of a position, ignoring the transform.
+
+    Parameters
+    ----------
+    own_mask (int): The marks of the player to move.
+    other_mask (int): The marks of the opponent.
+
+    Returns
+    -------
+    int: The smallest packed key of all symmetric versions.
+    """
+    return canonicalize(own_mask, other_mask)[0]
+
+
+def to_canonical(index, transform):
+    """
+    Maps a cell of the original board onto the canonical board.
+
+    Parameters
+    ----------
+    index (int): The index of the cell on the original board.
+    transform (int): The transform returned by canonicalize().
+
+    Returns
+    -------
+    int: The index of the cell on the canonical board.
+    """
+    return PERMUTATIONS[transform][index]
+
+
+def from_canonical(index, transform):
+    """
+    Maps a cell of the canonical board back onto the original board.
+
+    Parameters
+    ----------
+    index (int): The index of the cell on the canonical board.
+    transform (int): The transform returned by canonicalize().
+
+    Returns
+    -------
+    int: The index of the cell on the original board.
+    """
+    return INVERSE_PERMUTATIONS[transform][index]
@@ -0,0 +1,548 @@
+"""
+Round-robin tournament between AI strategies with Elo ratings.
+
+Every pair of strategies plays matches from both starting sides, spread
+over a pool of worker processes in chunks of games. A pairing stops early
+once a sequential probability ratio test shows who is stronger, or that
+they are within an Elo margin of each other, so most of the games go to
+the pairings that are still close. Unlike a confidence interval checked
+after every chunk, the test keeps its error rates however often it is
+checked. Elo ratings are fitted to all results at the end.
+"""
+
+import math
+import os
+from statistics import NormalDist
+from engine import GameBoard
+from simulate import _play_chunk, create_player
+from strategies import strategy_names
+
+# Strategies played by default, the searching AIs take 50 ms per move
+DEFAULT_STRATEGIES = ("easy", "hard", "perfect")
+
+# Confidence level of the reported score intervals
+DEFAULT_CONFIDENCE = 0.95
+
+# The Elo difference the stopping test tells apart from none, smaller
+# differences count as even
+DEFAULT_ELO_MARGIN = 20
+
+# The chance of each stopping test to pick the wrong hypothesis
+DEFAULT_ERROR_RATE = 0.05
+
+# Games a pairing plays before it may stop early
+DEFAULT_MIN_GAMES = 200
+
+# Draws against each opponent added to every strategy before fitting the
+# ratings, so a strategy that never scored still gets a finite rating
+PRIOR_DRAWS = 1
+
+# Rounds of the rating fit
+RATING_ITERATIONS = 200
+
+
+class PairingResult:
+    """
+    The results of one pairing of a tournament, from the view of its
+    first strategy.
+
+    Attributes
+    ----------
+    strategy_one (str): The first strategy.
+    strategy_two (str): The second strategy.
+    wins (int): The games strategy one won.
+    draws (int): The games nobody won.
+    losses (int): The games strategy one lost.
+    scheduled (int): The games handed to the workers so far.
+
+    Methods
+    ----------
+    games(): Returns the number of games played.
+
+    score(): Returns the average score of strategy one.
+
+    variance(): Returns the variance of the game scores.
+
+    confidence_interval(): Returns the confidence interval of the score.
+
+    elo_difference(): Converts a score into an Elo difference.
+
+    log_likelihood_ratio(): Weighs an Elo difference against none.
+
+    is_decided(): Checks if the pairing needs no more games.
+
+    to_dict(): Returns the results as a dict for printing or JSON.
+    """
+
+    def __init__(self, strategy_one, strategy_two):
+        """
+        Initializes a new pairing without any games.
+
+        Parameters
+        ----------
+        strategy_one (str): The first strategy.
+        strategy_two (str): The second strategy.
+        """
+        self.strategy_one = strategy_one
+        self.strategy_two = strategy_two
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+        self.scheduled = 0
+
+    def games(self):
+        """
+        Returns the number of games played.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        int: The wins, draws and losses added up.
+        """
+        return self.wins + self.draws + self.losses
+
+    def score(self):
+        """
+        Returns the average score of strategy one, a win counts 1 and a
+        draw half.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        float: The score between 0 and 1, 0.5 before any game.
+        """
+        games = self.games()
+        if not games:
+            return 0.5
+        return (self.wins + 0.5 * self.draws) / games
+
+    def variance(self):
+        """
+        Returns the variance of the game scores, a win counts 1 and a draw
+        half.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        float: The variance, 0 before any game.
+        """
+        games = self.games()
+        if not games:
+            return 0.0
+        mean = self.score()
+        return (
+            self.wins * (1 - mean) ** 2
+            + self.draws * (0.5 - mean) ** 2
+            + self.losses * mean**2
+        ) / games
+
+    def confidence_interval(self, confidence=DEFAULT_CONFIDENCE):
+        """
+        Returns the confidence interval of the score, with the normal
+        approximation of the mean of the game scores.
+
+        Parameters
+        ----------
+        confidence (float): The confidence level, for example 0.95.
+
+        Returns
+        -------
+        low (float): The lower bound of the score.
+        high (float): The upper bound of the score.
+        """
+        games = self.games()
+        if not games:
+            return 0.0, 1.0
+        mean = self.score()
+        margin = NormalDist().inv_cdf((1 + confidence) / 2) * math.sqrt(
+            self.variance() / games
+        )
+        return max(0.0, mean - margin), min(1.0, mean + margin)
+
+    def elo_difference(self, score=None):
+        """
+        Converts a score into the Elo difference between the strategies.
+
+        Parameters
+        ----------
+        score (float): The score to convert, the score of the pairing by
+                       default.
+
+        Returns
+        -------
+        float: How much stronger strategy one is, infinite if one of the
+               strategies scored every point.
+        """
+        if score is None:
+            score = self.score()
+        if score <= 0:
+            return -math.inf
+        if score >= 1:
+            return math.inf
+        return 400 * math.log10(score / (1 - score))
+
+    def log_likelihood_ratio(self, elo):
+        """
+        Weighs the hypothesis that strategy one is elo points stronger
+        against the hypothesis that the strategies are even, with the normal
+        approximation of the game scores.
+
+        Parameters
+        ----------
+        elo (float): The Elo difference of the alternative hypothesis.
+
+        Returns
+        -------
+        float: The log likelihood ratio, positive if the results favour the
+               Elo difference.
+        """
+        expected = expected_score(elo)
+        # How far the score lies beyond the middle of both hypotheses
+        evidence = self.games() * (expected - 0.5) * (2 * self.score() - 0.5 - expected)
+        variance = self.variance()
+        if variance:
+            return evidence / (2 * variance)
+        # Games that all ended the same leave no doubt
+        if evidence:
+            return math.copysign(math.inf, evidence)
+        return 0.0
+
+    def is_decided(
+        self,
+        elo_margin=DEFAULT_ELO_MARGIN,
+        error_rate=DEFAULT_ERROR_RATE,
+        min_games=DEFAULT_MIN_GAMES,
+    ):
+        """
+        Checks if the pairing needs no more games. Two sequential probability
+        ratio tests weigh strategy one being elo_margin points stronger, and
+        weaker, against the strategies being even. The pairing is decided
+        once either shows a stronger strategy or both show them even.
+
+        Parameters
+        ----------
+        elo_margin (float): The Elo difference told apart from none.
+        error_rate (float): The chance of each test to pick the wrong
+                            hypothesis.
+        min_games (int): The games played before the pairing can be decided.
+
+        Returns
+        -------
+        bool: True if the pairing is decided.
+        """
+        if self.games() < min_games:
+            return False
+        upper = math.log((1 - error_rate) / error_rate)
+        stronger = self.log_likelihood_ratio(elo_margin)
+        weaker = self.log_likelihood_ratio(-elo_margin)
+        return stronger >= upper or weaker >= upper or max(stronger, weaker) <= -upper
+
+    def to_dict(self, confidence=DEFAULT_CONFIDENCE):
+        """
+        Returns the results as a dict for printing or JSON.
+
+        Parameters
+        ----------
+        confidence (float): The confidence level of the intervals.
+
+        Returns
+        -------
+        dict: The results, score, interval and Elo difference, with None
+              for an infinite Elo difference, which JSON can't hold.
+        """
+        low, high = self.confidence_interval(confidence)
+
+        def finite(elo):
+            return elo if math.isfinite(elo) else None
+
+        return {
+            "strategy_one": self.strategy_one,
+            "strategy_two": self.strategy_two,
+            "wins": self.wins,
+            "draws": self.draws,
+            "losses": self.losses,
+            "score": self.score(),
+            "score_interval": (low, high),
+            "elo": finite(self.elo_difference()),
+            "elo_interval": (
+                finite(self.elo_difference(low)),
+                finite(self.elo_difference(high)),
+            ),
+        }
+
+
+def expected_score(elo):
+    """
+    Converts an Elo difference into the average score it predicts.
+
+    Parameters
+    ----------
+    elo (float): How much stronger a strategy is.
+
+    Returns
+    -------
+    float: The expected score of the stronger strategy, between 0 and 1.
+    """
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def elo_ratings(pairings, prior_draws=PRIOR_DRAWS, iterations=RATING_ITERATIONS):
+    """
+    Fits Elo ratings to the results of all pairings with the Bradley-Terry
+    model, counting a draw as half a win for both sides.
+
+    Parameters
+    ----------
+    pairings (list): PairingResult objects.
+    prior_draws (int): Draws added to every pairing, so every rating is
+                       finite.
+    iterations (int): The rounds of the fit.
+
+    Returns
+    -------
+    ratings (dict): The rating per strategy, 0 on average.
+    """
+    strategies = []
+    for pairing in pairings:
+        for strategy in (pairing.strategy_one, pairing.strategy_two):
+            if strategy not in strategies:
+                strategies.append(strategy)
+    points = dict.fromkeys(strategies, 0.0)
+    # The games per pair of strategies, in both orders
+    games = {}
+    for pairing in pairings:
+        one, two = pairing.strategy_one, pairing.strategy_two
+        count = pairing.games() + prior_draws
+        points[one] += pairing.wins + 0.5 * (pairing.draws + prior_draws)
+        points[two] += pairing.losses + 0.5 * (pairing.draws + prior_draws)
+        games[one, two] = games.get((one, two), 0) + count
+        games[two, one] = games.get((two, one), 0) + count
+
+    # Minorization-maximization updates of the strengths
+    strengths = dict.fromkeys(strategies, 1.0)
+    for _ in range(iterations):
+        for strategy in strategies:
+            denominator = sum(
+                count / (strengths[strategy] + strengths[other])
+                for (first, other), count in games.items()
+                if first == strategy
+            )
+            if denominator:
+                strengths[strategy] = points[strategy] / denominator
+    ratings = {
+        strategy: 400 * math.log10(strength) for strategy, strength in strengths.items()
+    }
+    mean = sum(ratings.values()) / len(ratings) if ratings else 0.0
+    return {strategy: rating - mean for strategy, rating in ratings.items()}
+
+
+def run_tournament(
+    strategies=DEFAULT_STRATEGIES,
+    max_games=10000,
+    workers=None,
+    chunk_size=100,
+    seed=0,
+    size=3,
+    win_length=3,
+    elo_margin=DEFAULT_ELO_MARGIN,
+    error_rate=DEFAULT_ERROR_RATE,
+    min_games=DEFAULT_MIN_GAMES,
+):
+    """
+    Plays a round-robin tournament between strategies over a pool of worker
+    processes. Every pair plays chunks of games, taking turns starting,
+    until it is decided or has played max_games.
+
+    Parameters
+    ----------
+    strategies (list): The strategies, see simulate.create_player().
+    max_games (int): The most games a pairing plays.
+    workers (int): The number of worker processes, all cores by default.
+    chunk_size (int): The number of games a worker plays per task.
+    seed (int): The seed that makes a run reproducible.
+    size (int): The number of rows and columns of the game board.
+    win_length (int): The number of marks in a row needed to win.
+    elo_margin (float): The Elo difference the stopping test tells apart
+                        from none.
+    error_rate (float): The chance of each stopping test to pick the wrong
+                        hypothesis.
+    min_games (int): The games a pairing plays before it can stop early.
+
+    Returns
+    -------
+    pairings (list): A PairingResult per pair of strategies.
+    ratings (dict): The Elo rating per strategy.
+
+    Raises
+    ------
+    ValueError: If a strategy is unknown, listed twice or the board shape
+                is invalid.
+    """
+    if len(set(strategies)) != len(strategies):
+        raise ValueError("Every strategy can only take part once")
+    # Fail early on unknown strategies or board shapes instead of in every worker
+    for strategy in strategies:
+        create_player(strategy, "X", size=size)
+    GameBoard(size, win_length)
+
+    pairings = [
+        PairingResult(strategy_one, strategy_two)
+        for position, strategy_one in enumerate(strategies)
+        for strategy_two in strategies[position + 1 :]
+    ]
+
+    def next_task(pairing):
+        # Chunks start on an even game so both sides start equally often
+        games = min(chunk_size + chunk_size % 2, max_games - pairing.scheduled)
+        task = (
+            pairing.strategy_one,
+            pairing.strategy_two,
+            pairing.scheduled,
+            games,
+            f"{seed}-{pairing.strategy_one}-{pairing.strategy_two}",
+            size,
+            win_length,
+            False,
+        )
+        pairing.scheduled += games
+        return task
+
+    def add_results(pairing, results):
+        pairing.wins += results["wins"]
+        pairing.draws += results["draws"]
+        pairing.losses += results["losses"]
+
+    def needs_games(pairing):
+        return pairing.scheduled < max_games and not pairing.is_decided(
+            elo_margin, error_rate, min_games
+        )
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        while True:
+            open_pairings = [pairing for pairing in pairings if needs_games(pairing)]
+            if not open_pairings:
+                break
+            for pairing in open_pairings:
+                results, _ = _play_chunk(next_task(pairing))
+                add_results(pairing, results)
+    else:
+        # Imported here, single process runs don't need it
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            running = {}
+            while True:
+                # Keep every worker busy with the pairings that are still open,
+                # taking turns between them
+                open_pairings = [
+                    pairing for pairing in pairings if needs_games(pairing)
+                ]
+                position = 0
+                while open_pairings and len(running) < 2 * workers:
+                    pairing = open_pairings[position % len(open_pairings)]
+                    running[executor.submit(_play_chunk, next_task(pairing))] = pairing
+                    if pairing.scheduled >= max_games:
+                        open_pairings.remove(pairing)
+                    else:
+                        position += 1
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results, _ = future.result()
+                    add_results(running.pop(future), results)
+
+    return pairings, elo_ratings(pairings)
+
+
+def main():
+    """
+    Runs a tournament from the command line and prints the results.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+    """
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(
+        description="Rate Tic Tac Toe AI strategies in a round-robin tournament."
+    )
+    parser.add_argument(
+        "strategies",
+        nargs="*",
+        default=list(DEFAULT_STRATEGIES),
+        help=f"{', '.join(strategy_names())} or module:function",
+    )
+    parser.add_argument("-n", "--max-games", type=int, default=10000)
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--size", type=int, default=3)
+    parser.add_argument("--win-length", type=int, default=3)
+    parser.add_argument("--confidence", type=float, default=DEFAULT_CONFIDENCE)
+    parser.add_argument("--elo-margin", type=float, default=DEFAULT_ELO_MARGIN)
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_ERROR_RATE)
+    parser.add_argument("--min-games", type=int, default=DEFAULT_MIN_GAMES)
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+    if len(args.strategies) < 2:
+        parser.error("a tournament needs at least two strategies")
+
+    try:
+        pairings, ratings = run_tournament(
+            args.strategies,
+            max_games=args.max_games,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            seed=args.seed,
+            size=args.size,
+            win_length=args.win_length,
+            elo_margin=args.elo_margin,
+            error_rate=args.error_rate,
+            min_games=args.min_games,
+        )
+    except ValueError as error:
+        parser.error(str(error))
+
+    for pairing in pairings:
+        low, high = pairing.confidence_interval(args.confidence)
+        print(
+            f"{pairing.strategy_one} vs {pairing.strategy_two}: "
+            f"{pairing.wins} wins, {pairing.draws} draws, {pairing.losses} losses, "
+            f"Elo {pairing.elo_difference():+.0f} "
+            f"[{pairing.elo_difference(low):+.0f}, {pairing.elo_difference(high):+.0f}]"
+        )
+    for strategy, rating in sorted(ratings.items(), key=lambda item: -item[1]):
+        print(f"{strategy:20} {rating:+7.0f}")
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(
+                {
+                    "pairings": [
+                        pairing.to_dict(args.confidence) for pairing in pairings
+                    ],
+                    "ratings": ratings,
+                },
+                output_file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()